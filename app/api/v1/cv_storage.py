@@ -2,7 +2,9 @@
 API endpoints cho CV storage và management
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Body
-from typing import Dict, Any, List, Optional
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, Optional
+import json
 import logging
 
 from app.core.security import get_current_user
@@ -56,7 +58,7 @@ async def get_cv_by_id(
         )
 
 
-@router.get("/cv/user/{user_id}", response_model=List[Dict[str, Any]])
+@router.get("/cv/user/{user_id}", response_model=Dict[str, Any])
 async def get_user_cvs(
     user_id: str,
     limit: int = Query(50, ge=1, le=100),
@@ -83,6 +85,12 @@ async def get_user_cvs(
         
     except HTTPException:
         raise
+    except ValueError as e:
+        # Malformed last_key cursor
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Failed to get user CVs: {str(e)}")
         raise HTTPException(
@@ -91,6 +99,30 @@ async def get_user_cvs(
         )
 
 
+@router.get("/cv/user/{user_id}/stream")
+async def stream_user_cvs(
+    user_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Stream toàn bộ CV của user dạng NDJSON (mỗi dòng một CV)"""
+    if user_id != current_user.user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Unauthorized: Cannot access other user's CVs"
+        )
+    
+    async def ndjson_lines():
+        try:
+            async for cv in cv_storage_service.iter_user_cvs(user_id):
+                yield json.dumps(cv) + "\n"
+        except Exception as e:
+            # Response đã bắt đầu gửi, không thể đổi status code nữa
+            logger.error(f"Failed to stream user CVs: {str(e)}")
+            raise
+    
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
 @router.post("/cv/{cv_id}/analyze", response_model=Dict[str, Any])
 async def analyze_cv(
     cv_id: str,
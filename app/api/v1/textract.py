@@ -5,12 +5,13 @@ Xử lý text extraction từ CV documents
 
 import logging
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 
 from app.core.security import verify_token
+from app.models.cv import CVSections, CVKeyInformation, CVQualityMetrics
 from app.services.textract import textract_service
 from app.services.s3 import s3_service
 from app.utils.logger import get_logger
@@ -32,9 +33,9 @@ class TextExtractionResponse(BaseModel):
     extraction_id: Optional[str] = None
     text: Optional[str] = None
     confidence: Optional[float] = None
-    sections: Optional[Dict[str, str]] = None
-    key_information: Optional[Dict[str, Any]] = None
-    quality_metrics: Optional[Dict[str, Any]] = None
+    sections: Optional[CVSections] = None
+    key_information: Optional[CVKeyInformation] = None
+    quality_metrics: Optional[CVQualityMetrics] = None
     processing_time: Optional[float] = None
     extraction_timestamp: Optional[str] = None
 
@@ -14,6 +14,7 @@ class Settings(BaseSettings):
     # Database
     dynamodb_region: str = "us-east-1"
     dynamodb_endpoint_url: Optional[str] = None
+    dynamodb_max_pool_connections: int = 50  # keep-alive connection pool size per client
     database_url: Optional[str] = None
     
     # JWT
@@ -1,5 +1,6 @@
 import boto3
 from typing import Optional, Dict, Any, List
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from app.core.config import settings
 import json
@@ -11,6 +12,12 @@ class DynamoDBClient:
         # Prepare boto3 configuration
         boto3_config = {
             'region_name': settings.dynamodb_region,
+            # Reuse pooled keep-alive connections instead of a new TLS handshake per call
+            'config': Config(
+                max_pool_connections=settings.dynamodb_max_pool_connections,
+                tcp_keepalive=True,
+                retries={'max_attempts': 3, 'mode': 'adaptive'}
+            ),
         }
         
         # Add endpoint_url if specified (for local DynamoDB)
@@ -105,7 +112,6 @@ class DynamoDBClient:
             print(f"Error scanning items: {e}")
             return []
 
-
 # Global database client instance
 db_client = DynamoDBClient()
 
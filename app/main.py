@@ -1,8 +1,9 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 import time
 
@@ -10,6 +11,7 @@ from app.core.config import settings
 from app.api.v1 import auth, upload, textract, cv_storage
 from app.middleware.logging import LoggingMiddleware
 from app.middleware.rate_limit import RateLimitMiddleware
+from app.repositories.cv_storage import cv_storage_repository
 
 logging.basicConfig(
     level=logging.INFO,
@@ -25,6 +27,12 @@ async def lifespan(app: FastAPI):
     logger.info(f"Debug mode: {settings.debug}")
     logger.info(f"Database region: {settings.dynamodb_region}")
     
+    try:
+        await asyncio.to_thread(cv_storage_repository.warm_up)
+    except Exception as e:
+        # Không chặn startup; connection sẽ được mở lazily ở request đầu tiên
+        logger.warning(f"DynamoDB warm-up failed: {e}")
+    
     yield
     
     logger.info("Shutting down AI Resume Analyzer & Job Match API...")
@@ -35,7 +43,8 @@ app = FastAPI(
     version=settings.app_version,
     description="AI-powered resume analysis and job matching system",
     debug=settings.debug,
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
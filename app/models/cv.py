@@ -4,10 +4,65 @@ Comprehensive Pydantic models cho CV data structure với validation và seriali
 """
 
 from datetime import datetime, date
-from typing import List, Optional, Dict, Any, Union
+from typing import Annotated, List, Optional, Dict, Any, Union
+from typing_extensions import TypedDict
 from enum import Enum
-from pydantic import BaseModel, Field, validator, root_validator
+from operator import itemgetter
+from functools import lru_cache
+from dataclasses import dataclass, field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, HttpUrl, StringConstraints, field_validator, model_validator
 import re
+import sys
+
+
+# Trimmed name-like string (person, company, institution, ...) with at least 2 characters
+ShortName = Annotated[str, StringConstraints(strip_whitespace=True, min_length=2)]
+
+
+_VALID_PROFICIENCY = frozenset({
+    'beginner', 'elementary', 'intermediate', 'upper-intermediate', 'advanced', 'native', 'fluent'
+})
+_VALID_PROFICIENCY_MSG = 'beginner, elementary, intermediate, upper-intermediate, advanced, native, fluent'
+
+_DATE_MIN = date.min
+
+# Shared config for request models: unknown fields are rejected instead of being collected
+# as extras, and assignment stays unvalidated so post-construction updates remain cheap
+_CV_MODEL_CONFIG = ConfigDict(extra='forbid', frozen=False, validate_assignment=False)
+# Models built straight from Textract output (and their nested components) tolerate
+# and drop extra keys
+_CV_INGEST_CONFIG = ConfigDict(extra='ignore', frozen=False, validate_assignment=False)
+
+
+@lru_cache(maxsize=None)
+def _non_digit_re() -> re.Pattern:
+    """Compiled on first phone validation instead of at import time"""
+    return re.compile(r'\D')
+
+
+def _blank_to_none(v):
+    """Extracted fields often come back as "" when absent; treat them as missing"""
+    if isinstance(v, str) and not v.strip():
+        return None
+    return v
+
+
+def _normalize_url(v):
+    """Blank -> None, and add https:// to bare hosts such as linkedin.com/in/x"""
+    v = _blank_to_none(v)
+    if isinstance(v, str):
+        v = v.strip()
+        if '://' not in v:
+            v = f'https://{v}'
+    return v
+
+
+def _sort_most_recent_first(items: list, date_field: str) -> list:
+    """Sort entries by a date field (most recent first), skipping the sort if already ordered"""
+    keys = [getattr(item, date_field) or _DATE_MIN for item in items]
+    if all(keys[i] >= keys[i + 1] for i in range(len(keys) - 1)):
+        return items
+    return [item for _, item in sorted(zip(keys, items), key=itemgetter(0), reverse=True)]
 
 
 class DocumentType(str, Enum):
@@ -47,28 +102,66 @@ class SkillCategory(str, Enum):
     TOOL = "tool"
 
 
+class CVSections(TypedDict, total=False):
+    """Section texts extracted from a CV (keys produced by TextractService._extract_sections)"""
+    personal_info: str
+    experience: str
+    education: str
+    skills: str
+    projects: str
+    certifications: str
+    languages: str
+    interests: str
+
+
+class CVKeyInformation(TypedDict, total=False):
+    """Key information extracted from a CV (TextractService._extract_key_information)"""
+    emails: List[str]
+    phones: List[str]
+    years_mentioned: List[int]
+    skills_mentioned: List[str]
+
+
+class CVQualityMetrics(TypedDict, total=False):
+    """Text quality metrics (TextractService._calculate_text_quality)"""
+    word_count: int
+    char_count: int
+    line_count: int
+    sentence_count: int
+    avg_words_per_sentence: float
+    avg_chars_per_word: float
+    estimated_confidence: float
+
+
 class ContactInfo(BaseModel):
     """Contact information model"""
-    email: Optional[str] = Field(None, description="Email address")
+    model_config = _CV_INGEST_CONFIG
+    
+    email: Optional[EmailStr] = Field(None, description="Email address")
     phone: Optional[str] = Field(None, description="Phone number")
     address: Optional[str] = Field(None, description="Physical address")
     city: Optional[str] = Field(None, description="City")
     country: Optional[str] = Field(None, description="Country")
-    linkedin: Optional[str] = Field(None, description="LinkedIn profile")
-    github: Optional[str] = Field(None, description="GitHub profile")
-    website: Optional[str] = Field(None, description="Personal website")
+    linkedin: Optional[HttpUrl] = Field(None, description="LinkedIn profile")
+    github: Optional[HttpUrl] = Field(None, description="GitHub profile")
+    website: Optional[HttpUrl] = Field(None, description="Personal website")
     
-    @validator('email')
+    @field_validator('email', mode='before')
+    @classmethod
     def validate_email(cls, v):
-        if v and not re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', v):
-            raise ValueError('Invalid email format')
-        return v
+        return _blank_to_none(v)
     
-    @validator('phone')
+    @field_validator('linkedin', 'github', 'website', mode='before')
+    @classmethod
+    def validate_urls(cls, v):
+        return _normalize_url(v)
+    
+    @field_validator('phone')
+    @classmethod
     def validate_phone(cls, v):
         if v:
             # Remove all non-digit characters
-            digits = re.sub(r'\D', '', v)
+            digits = _non_digit_re().sub('', v)
             if len(digits) < 7 or len(digits) > 15:
                 raise ValueError('Phone number must be between 7 and 15 digits')
         return v
@@ -76,7 +169,9 @@ class ContactInfo(BaseModel):
 
 class PersonalInfo(BaseModel):
     """Personal information model"""
-    full_name: Optional[str] = Field(None, description="Full name")
+    model_config = _CV_INGEST_CONFIG
+    
+    full_name: Optional[ShortName] = Field(None, description="Full name")
     first_name: Optional[str] = Field(None, description="First name")
     last_name: Optional[str] = Field(None, description="Last name")
     title: Optional[str] = Field(None, description="Professional title")
@@ -85,32 +180,29 @@ class PersonalInfo(BaseModel):
     date_of_birth: Optional[date] = Field(None, description="Date of birth")
     nationality: Optional[str] = Field(None, description="Nationality")
     
-    @validator('full_name')
+    @field_validator('full_name', mode='before')
+    @classmethod
     def validate_full_name(cls, v):
-        if v and len(v.strip()) < 2:
-            raise ValueError('Full name must be at least 2 characters')
-        return v.strip() if v else v
+        return _blank_to_none(v)
 
 
 class Skill(BaseModel):
     """Skill model"""
-    name: str = Field(..., description="Skill name")
+    model_config = _CV_INGEST_CONFIG
+    
+    name: ShortName = Field(..., description="Skill name")
     category: SkillCategory = Field(..., description="Skill category")
     level: Optional[str] = Field(None, description="Skill level (beginner, intermediate, advanced)")
     years_experience: Optional[float] = Field(None, ge=0, le=50, description="Years of experience")
     confidence: Optional[float] = Field(None, ge=0, le=100, description="Confidence level (0-100)")
     keywords: Optional[List[str]] = Field(None, description="Related keywords")
-    
-    @validator('name')
-    def validate_name(cls, v):
-        if not v or len(v.strip()) < 2:
-            raise ValueError('Skill name must be at least 2 characters')
-        return v.strip()
 
 
 class Education(BaseModel):
     """Education model"""
-    institution: str = Field(..., description="Institution name")
+    model_config = _CV_INGEST_CONFIG
+    
+    institution: ShortName = Field(..., description="Institution name")
     degree: Optional[str] = Field(None, description="Degree name")
     field_of_study: Optional[str] = Field(None, description="Field of study")
     level: EducationLevel = Field(..., description="Education level")
@@ -121,29 +213,27 @@ class Education(BaseModel):
     description: Optional[str] = Field(None, description="Additional description")
     is_current: bool = Field(False, description="Currently studying")
     
-    @validator('institution')
-    def validate_institution(cls, v):
-        if not v or len(v.strip()) < 2:
-            raise ValueError('Institution name must be at least 2 characters')
-        return v.strip()
-    
-    @root_validator
-    def validate_dates(cls, values):
-        start_date = values.get('start_date')
-        end_date = values.get('end_date')
-        is_current = values.get('is_current', False)
+    @model_validator(mode='after')
+    def validate_dates(self):
+        start_date = self.start_date
+        if not start_date:
+            return self
+        end_date = self.end_date
+        if not end_date:
+            return self
         
-        if start_date and end_date and not is_current:
-            if start_date > end_date:
-                raise ValueError('Start date must be before end date')
+        if start_date > end_date and not self.is_current:
+            raise ValueError('Start date must be before end date')
         
-        return values
+        return self
 
 
 class WorkExperience(BaseModel):
     """Work experience model"""
-    company: str = Field(..., description="Company name")
-    position: str = Field(..., description="Job position")
+    model_config = _CV_INGEST_CONFIG
+    
+    company: ShortName = Field(..., description="Company name")
+    position: ShortName = Field(..., description="Job position")
     department: Optional[str] = Field(None, description="Department")
     start_date: Optional[date] = Field(None, description="Start date")
     end_date: Optional[date] = Field(None, description="End date")
@@ -155,34 +245,26 @@ class WorkExperience(BaseModel):
     team_size: Optional[int] = Field(None, ge=1, description="Team size")
     reporting_to: Optional[str] = Field(None, description="Reporting manager")
     
-    @validator('company')
-    def validate_company(cls, v):
-        if not v or len(v.strip()) < 2:
-            raise ValueError('Company name must be at least 2 characters')
-        return v.strip()
-    
-    @validator('position')
-    def validate_position(cls, v):
-        if not v or len(v.strip()) < 2:
-            raise ValueError('Position must be at least 2 characters')
-        return v.strip()
-    
-    @root_validator
-    def validate_dates(cls, values):
-        start_date = values.get('start_date')
-        end_date = values.get('end_date')
-        is_current = values.get('is_current', False)
+    @model_validator(mode='after')
+    def validate_dates(self):
+        start_date = self.start_date
+        if not start_date:
+            return self
+        end_date = self.end_date
+        if not end_date:
+            return self
         
-        if start_date and end_date and not is_current:
-            if start_date > end_date:
-                raise ValueError('Start date must be before end date')
+        if start_date > end_date and not self.is_current:
+            raise ValueError('Start date must be before end date')
         
-        return values
+        return self
 
 
 class Project(BaseModel):
     """Project model"""
-    name: str = Field(..., description="Project name")
+    model_config = _CV_INGEST_CONFIG
+    
+    name: ShortName = Field(..., description="Project name")
     description: Optional[str] = Field(None, description="Project description")
     start_date: Optional[date] = Field(None, description="Start date")
     end_date: Optional[date] = Field(None, description="End date")
@@ -190,62 +272,56 @@ class Project(BaseModel):
     technologies: Optional[List[str]] = Field(None, description="Technologies used")
     team_size: Optional[int] = Field(None, ge=1, description="Team size")
     role: Optional[str] = Field(None, description="Role in project")
-    url: Optional[str] = Field(None, description="Project URL")
+    url: Optional[HttpUrl] = Field(None, description="Project URL")
     achievements: Optional[List[str]] = Field(None, description="Key achievements")
     
-    @validator('name')
-    def validate_name(cls, v):
-        if not v or len(v.strip()) < 2:
-            raise ValueError('Project name must be at least 2 characters')
-        return v.strip()
+    @field_validator('url', mode='before')
+    @classmethod
+    def validate_url(cls, v):
+        return _normalize_url(v)
 
 
 class Certification(BaseModel):
     """Certification model"""
-    name: str = Field(..., description="Certification name")
-    issuer: str = Field(..., description="Issuing organization")
+    model_config = _CV_INGEST_CONFIG
+    
+    name: ShortName = Field(..., description="Certification name")
+    issuer: ShortName = Field(..., description="Issuing organization")
     issue_date: Optional[date] = Field(None, description="Issue date")
     expiry_date: Optional[date] = Field(None, description="Expiry date")
     credential_id: Optional[str] = Field(None, description="Credential ID")
-    url: Optional[str] = Field(None, description="Verification URL")
+    url: Optional[HttpUrl] = Field(None, description="Verification URL")
     is_current: bool = Field(True, description="Currently valid")
     
-    @validator('name')
-    def validate_name(cls, v):
-        if not v or len(v.strip()) < 2:
-            raise ValueError('Certification name must be at least 2 characters')
-        return v.strip()
-    
-    @validator('issuer')
-    def validate_issuer(cls, v):
-        if not v or len(v.strip()) < 2:
-            raise ValueError('Issuer name must be at least 2 characters')
-        return v.strip()
+    @field_validator('url', mode='before')
+    @classmethod
+    def validate_url(cls, v):
+        return _normalize_url(v)
 
 
 class Language(BaseModel):
     """Language model"""
-    name: str = Field(..., description="Language name")
+    model_config = _CV_INGEST_CONFIG
+    
+    name: ShortName = Field(..., description="Language name")
     proficiency: str = Field(..., description="Proficiency level")
     is_native: bool = Field(False, description="Native language")
     certifications: Optional[List[str]] = Field(None, description="Language certifications")
     
-    @validator('name')
-    def validate_name(cls, v):
-        if not v or len(v.strip()) < 2:
-            raise ValueError('Language name must be at least 2 characters')
-        return v.strip()
-    
-    @validator('proficiency')
+    @field_validator('proficiency')
+    @classmethod
     def validate_proficiency(cls, v):
-        valid_levels = ['beginner', 'elementary', 'intermediate', 'upper-intermediate', 'advanced', 'native', 'fluent']
-        if v.lower() not in valid_levels:
-            raise ValueError(f'Proficiency must be one of: {", ".join(valid_levels)}')
-        return v.lower()
+        lv = v.lower()
+        if lv not in _VALID_PROFICIENCY:
+            raise ValueError(f'Proficiency must be one of: {_VALID_PROFICIENCY_MSG}')
+        # Interned: the same few levels repeat across every CV
+        return sys.intern(lv)
 
 
 class CVAnalysis(BaseModel):
     """Main CV analysis model"""
+    model_config = _CV_INGEST_CONFIG
+    
     # Basic information
     document_type: DocumentType = Field(..., description="Type of document")
     personal_info: Optional[PersonalInfo] = Field(None, description="Personal information")
@@ -273,8 +349,8 @@ class CVAnalysis(BaseModel):
     
     # Raw data
     raw_text: Optional[str] = Field(None, description="Raw extracted text")
-    sections: Optional[Dict[str, str]] = Field(None, description="Extracted sections")
-    key_information: Optional[Dict[str, Any]] = Field(None, description="Key information extracted")
+    sections: Optional[CVSections] = Field(None, description="Extracted sections")
+    key_information: Optional[CVKeyInformation] = Field(None, description="Key information extracted")
     
     # File information
     file_id: Optional[str] = Field(None, description="Original file ID")
@@ -282,70 +358,53 @@ class CVAnalysis(BaseModel):
     file_type: Optional[str] = Field(None, description="Original file type")
     file_size: Optional[int] = Field(None, description="Original file size")
     
-    @validator('work_experience')
+    @field_validator('work_experience')
+    @classmethod
     def validate_work_experience(cls, v):
         if v:
             # Sort by start date (most recent first)
-            return sorted(v, key=lambda x: x.start_date or date.min, reverse=True)
+            return _sort_most_recent_first(v, 'start_date')
         return v
     
-    @validator('education')
+    @field_validator('education')
+    @classmethod
     def validate_education(cls, v):
         if v:
             # Sort by end date (most recent first)
-            return sorted(v, key=lambda x: x.end_date or date.min, reverse=True)
+            return _sort_most_recent_first(v, 'end_date')
         return v
     
-    @root_validator
-    def calculate_scores(cls, values):
+    @model_validator(mode='after')
+    def calculate_scores(self):
         """Calculate various scores based on available data"""
-        try:
-            # Calculate completeness score
-            completeness = 0
-            total_fields = 0
-            
-            if values.get('personal_info'):
-                completeness += 1
-            total_fields += 1
-            
-            if values.get('work_experience'):
-                completeness += 1
-            total_fields += 1
-            
-            if values.get('education'):
-                completeness += 1
-            total_fields += 1
-            
-            if values.get('skills'):
-                completeness += 1
-            total_fields += 1
-            
-            if total_fields > 0:
-                values['completeness_score'] = (completeness / total_fields) * 100
-            
-            # Calculate quality score based on data richness
-            quality = 0
-            if values.get('personal_info') and values.get('personal_info').contact:
-                quality += 20
-            if values.get('work_experience'):
-                quality += min(len(values['work_experience']) * 10, 40)
-            if values.get('skills'):
-                quality += min(len(values['skills']) * 2, 20)
-            if values.get('education'):
-                quality += min(len(values['education']) * 10, 20)
-            
-            values['quality_score'] = min(quality, 100)
-            
-        except Exception:
-            # If calculation fails, set default values
-            values['completeness_score'] = 0
-            values['quality_score'] = 0
+        # Scores are persisted with the analysis; reloading it must not recompute them
+        if self.quality_score is not None and self.completeness_score is not None:
+            return self
+        
+        personal_info = self.personal_info
+        work_experience = self.work_experience or ()
+        education = self.education or ()
+        skills = self.skills or ()
+        
+        # Calculate completeness score (4 sections)
+        completeness = (bool(personal_info) + bool(work_experience)
+                        + bool(education) + bool(skills))
+        self.completeness_score = (completeness / 4) * 100
+        
+        # Calculate quality score based on data richness
+        quality = ((20 if personal_info and personal_info.contact else 0)
+                   + min(len(work_experience) * 10, 40)
+                   + min(len(skills) * 2, 20)
+                   + min(len(education) * 10, 20))
+        self.quality_score = min(quality, 100)
         
-        return values
+        return self
 
 
 class CVUpload(BaseModel):
     """CV upload model"""
+    model_config = _CV_MODEL_CONFIG
+    
     file_id: str = Field(..., description="Unique file ID")
     user_id: str = Field(..., description="User ID")
     filename: str = Field(..., description="Original filename")
@@ -356,7 +415,8 @@ class CVUpload(BaseModel):
     status: str = Field("pending", description="Processing status")
     analysis_id: Optional[str] = Field(None, description="Analysis ID")
     
-    @validator('filename')
+    @field_validator('filename')
+    @classmethod
     def validate_filename(cls, v):
         if not v or len(v.strip()) < 1:
             raise ValueError('Filename cannot be empty')
@@ -365,46 +425,50 @@ class CVUpload(BaseModel):
 
 class CVContent(BaseModel):
     """CV content model for raw text storage"""
+    model_config = _CV_INGEST_CONFIG
+    
     file_id: str = Field(..., description="File ID")
     raw_text: str = Field(..., description="Raw extracted text")
-    sections: Dict[str, str] = Field(default_factory=dict, description="Extracted sections")
-    key_information: Dict[str, Any] = Field(default_factory=dict, description="Key information")
-    quality_metrics: Dict[str, Any] = Field(default_factory=dict, description="Quality metrics")
+    sections: CVSections = Field(default_factory=dict, description="Extracted sections")
+    key_information: CVKeyInformation = Field(default_factory=dict, description="Key information")
+    quality_metrics: CVQualityMetrics = Field(default_factory=dict, description="Quality metrics")
     extraction_timestamp: datetime = Field(default_factory=datetime.utcnow, description="Extraction timestamp")
     confidence_score: Optional[float] = Field(None, ge=0, le=100, description="Extraction confidence")
     
-    @validator('raw_text')
+    @field_validator('raw_text')
+    @classmethod
     def validate_raw_text(cls, v):
         if not v or len(v.strip()) < 10:
             raise ValueError('Raw text must be at least 10 characters')
         return v.strip()
 
 
-class CVAnalysisSummary(BaseModel):
-    """CV analysis summary for quick overview"""
-    file_id: str = Field(..., description="File ID")
-    user_id: str = Field(..., description="User ID")
-    name: Optional[str] = Field(None, description="Candidate name")
-    title: Optional[str] = Field(None, description="Professional title")
-    experience_level: Optional[ExperienceLevel] = Field(None, description="Experience level")
-    total_experience: Optional[float] = Field(None, description="Total years of experience")
-    skills_count: int = Field(0, description="Number of skills")
-    education_count: int = Field(0, description="Number of education entries")
-    projects_count: int = Field(0, description="Number of projects")
-    confidence_score: Optional[float] = Field(None, description="Analysis confidence")
-    quality_score: Optional[float] = Field(None, description="Document quality")
-    completeness_score: Optional[float] = Field(None, description="Information completeness")
-    analysis_timestamp: datetime = Field(default_factory=datetime.utcnow, description="Analysis timestamp")
+@dataclass
+class CVAnalysisSummary:
+    """CV analysis summary for quick overview (plain dataclass: built in bulk for list/search responses)"""
+    file_id: str
+    user_id: str
+    name: Optional[str] = None  # Candidate name
+    title: Optional[str] = None  # Professional title
+    experience_level: Optional[ExperienceLevel] = None
+    total_experience: Optional[float] = None  # Total years of experience
+    skills_count: int = 0
+    education_count: int = 0
+    projects_count: int = 0
+    confidence_score: Optional[float] = None  # Analysis confidence
+    quality_score: Optional[float] = None  # Document quality
+    completeness_score: Optional[float] = None  # Information completeness
+    analysis_timestamp: datetime = field(default_factory=datetime.utcnow)
     
-    @validator('skills_count', 'education_count', 'projects_count')
-    def validate_counts(cls, v):
-        if v < 0:
+    def __post_init__(self):
+        if self.skills_count < 0 or self.education_count < 0 or self.projects_count < 0:
             raise ValueError('Counts cannot be negative')
-        return v
 
 
 class CVSearchFilters(BaseModel):
     """CV search filters model"""
+    model_config = _CV_MODEL_CONFIG
+    
     experience_level: Optional[List[ExperienceLevel]] = Field(None, description="Experience levels")
     education_level: Optional[List[EducationLevel]] = Field(None, description="Education levels")
     skills: Optional[List[str]] = Field(None, description="Required skills")
@@ -414,34 +478,35 @@ class CVSearchFilters(BaseModel):
     has_certifications: Optional[bool] = Field(None, description="Has certifications")
     languages: Optional[List[str]] = Field(None, description="Required languages")
     
-    @root_validator
-    def validate_experience_range(cls, values):
-        min_exp = values.get('min_experience')
-        max_exp = values.get('max_experience')
+    @model_validator(mode='after')
+    def validate_experience_range(self):
+        min_exp = self.min_experience
+        max_exp = self.max_experience
         
         if min_exp is not None and max_exp is not None:
             if min_exp > max_exp:
                 raise ValueError('Minimum experience cannot be greater than maximum experience')
         
-        return values
-
-
-class CVMatchScore(BaseModel):
-    """CV match score model"""
-    cv_id: str = Field(..., description="CV ID")
-    job_id: str = Field(..., description="Job ID")
-    overall_score: float = Field(..., ge=0, le=100, description="Overall match score")
-    skills_match: float = Field(..., ge=0, le=100, description="Skills match score")
-    experience_match: float = Field(..., ge=0, le=100, description="Experience match score")
-    education_match: float = Field(..., ge=0, le=100, description="Education match score")
-    location_match: float = Field(..., ge=0, le=100, description="Location match score")
-    missing_skills: Optional[List[str]] = Field(None, description="Missing skills")
-    matching_skills: Optional[List[str]] = Field(None, description="Matching skills")
-    score_breakdown: Optional[Dict[str, Any]] = Field(None, description="Detailed score breakdown")
-    match_timestamp: datetime = Field(default_factory=datetime.utcnow, description="Match timestamp")
-    
-    @validator('overall_score', 'skills_match', 'experience_match', 'education_match', 'location_match')
-    def validate_scores(cls, v):
-        if not 0 <= v <= 100:
-            raise ValueError('Scores must be between 0 and 100')
-        return v
+        return self
+
+
+@dataclass
+class CVMatchScore:
+    """CV match score model (plain dataclass: built in bulk for match responses)"""
+    cv_id: str
+    job_id: str
+    overall_score: float
+    skills_match: float
+    experience_match: float
+    education_match: float
+    location_match: float
+    missing_skills: Optional[List[str]] = None
+    matching_skills: Optional[List[str]] = None
+    score_breakdown: Optional[Dict[str, Any]] = None  # Detailed score breakdown
+    match_timestamp: datetime = field(default_factory=datetime.utcnow)
+    
+    def __post_init__(self):
+        for score in (self.overall_score, self.skills_match, self.experience_match,
+                      self.education_match, self.location_match):
+            if not 0 <= score <= 100:
+                raise ValueError('Scores must be between 0 and 100')
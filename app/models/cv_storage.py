@@ -4,17 +4,51 @@ DynamoDB models cho CV data storage
 from pynamodb.models import Model
 from pynamodb.attributes import (
     UnicodeAttribute, NumberAttribute, UTCDateTimeAttribute, 
-    ListAttribute, MapAttribute, BooleanAttribute, JSONAttribute
+    ListAttribute, MapAttribute, BooleanAttribute, JSONAttribute, Attribute
 )
-from pynamodb.indexes import GlobalSecondaryIndex, AllProjection
+from pynamodb.constants import MAP, STRING
+from pynamodb.indexes import GlobalSecondaryIndex, AllProjection, KeysOnlyProjection
 from typing import Dict, Any, Optional, List
 from datetime import datetime
+from operator import attrgetter
 import json
 
 from app.core.config import settings
 from app.models.cv import CVAnalysis, CVContent
 
 
+def _map_to_dict(value) -> Dict[str, Any]:
+    """PynamoDB giữ raw MapAttribute dưới dạng MapAttribute instance, chuyển về dict thường"""
+    return value.as_dict() if isinstance(value, MapAttribute) else dict(value or {})
+
+
+# Module-level (không phải class attribute: Attribute là descriptor) để serialize raw map
+_RAW_MAP = MapAttribute()
+
+
+class JSONMapAttribute(Attribute[Dict[str, Any]]):
+    """Dict lưu dưới dạng native map (M), vẫn đọc được JSON string (S) do JSONAttribute ghi.
+    
+    Cho phép deploy trước, rồi mới chạy migrate_data.py --migrate-cv-maps.
+    """
+    attr_type = MAP
+    
+    def get_value(self, value: Dict[str, Any]) -> Dict[str, Any]:
+        if STRING in value:
+            try:
+                data = json.loads(value[STRING] or '{}')
+            except ValueError:
+                data = {}
+            return self.serialize(data if isinstance(data, dict) else {})
+        return super().get_value(value)
+    
+    def serialize(self, value: Dict[str, Any]) -> Dict[str, Any]:
+        return _RAW_MAP.serialize(value)
+    
+    def deserialize(self, value: Dict[str, Any]) -> Dict[str, Any]:
+        return _RAW_MAP.deserialize(value)
+
+
 class CVStorageIndex(GlobalSecondaryIndex):
     """GSI cho CV storage queries"""
     class Meta:
@@ -33,7 +67,7 @@ class CVSkillsIndex(GlobalSecondaryIndex):
         index_name = 'skills-index'
         read_capacity_units = 5
         write_capacity_units = 5
-        projection = AllProjection()
+        projection = KeysOnlyProjection()  # Full item được đọc lại qua CVTable.batch_get
     
     skill_name = UnicodeAttribute(hash_key=True)
     skill_level = UnicodeAttribute(range_key=True)
@@ -45,7 +79,7 @@ class CVExperienceIndex(GlobalSecondaryIndex):
         index_name = 'experience-index'
         read_capacity_units = 5
         write_capacity_units = 5
-        projection = AllProjection()
+        projection = KeysOnlyProjection()  # Full item được đọc lại qua CVTable.batch_get
     
     experience_years = NumberAttribute(hash_key=True)
     job_title = UnicodeAttribute(range_key=True)
@@ -57,7 +91,7 @@ class CVEducationIndex(GlobalSecondaryIndex):
         index_name = 'education-index'
         read_capacity_units = 5
         write_capacity_units = 5
-        projection = AllProjection()
+        projection = KeysOnlyProjection()  # Full item được đọc lại qua CVTable.batch_get
     
     education_level = UnicodeAttribute(hash_key=True)
     degree = UnicodeAttribute(range_key=True)
@@ -69,12 +103,24 @@ class CVLocationIndex(GlobalSecondaryIndex):
         index_name = 'location-index'
         read_capacity_units = 5
         write_capacity_units = 5
-        projection = AllProjection()
+        projection = KeysOnlyProjection()  # Full item được đọc lại qua CVTable.batch_get
     
     location = UnicodeAttribute(hash_key=True)
     created_at = UTCDateTimeAttribute(range_key=True)
 
 
+class CVSearchUserIndex(GlobalSecondaryIndex):
+    """GSI cho recent searches của user (mới nhất trước)"""
+    class Meta:
+        index_name = 'user_id-created_at-index'
+        read_capacity_units = 5
+        write_capacity_units = 5
+        projection = AllProjection()
+    
+    user_id = UnicodeAttribute(hash_key=True)
+    created_at = UTCDateTimeAttribute(range_key=True)
+
+
 class CVTable(Model):
     """DynamoDB table cho CV storage"""
     
@@ -83,6 +129,7 @@ class CVTable(Model):
         region = settings.aws_region
         aws_access_key_id = settings.aws_access_key_id
         aws_secret_access_key = settings.aws_secret_access_key
+        max_pool_connections = settings.dynamodb_max_pool_connections
         read_capacity_units = 10
         write_capacity_units = 10
     
@@ -97,9 +144,9 @@ class CVTable(Model):
     s3_key = UnicodeAttribute()
     s3_url = UnicodeAttribute()
     
-    # Analysis data
-    analysis_result = JSONAttribute()
-    raw_content = JSONAttribute()
+    # Analysis data (stored as native DynamoDB maps, no json.dumps/json.loads round trip)
+    analysis_result = JSONMapAttribute(default=dict)
+    raw_content = JSONMapAttribute(default=dict)
     
     # Metadata
     status = UnicodeAttribute(default="uploaded")  # uploaded, processing, analyzed, failed
@@ -124,58 +171,68 @@ class CVTable(Model):
     education_index = CVEducationIndex()
     location_index = CVLocationIndex()
     
+    _DICT_FIELDS = (
+        'cv_id', 'user_id', 'filename', 'file_size', 'file_type', 's3_key', 's3_url',
+        'analysis_result', 'raw_content', 'status', 'textract_job_id',
+        'analysis_timestamp', 'created_at', 'updated_at',
+        'skill_name', 'skill_level', 'experience_years', 'job_title',
+        'education_level', 'degree', 'location'
+    )
+    _DICT_GETTER = attrgetter(*_DICT_FIELDS)
+    
+    # Attributes cần cho list views (không gồm analysis_result / raw_content)
+    LIST_FIELDS = (
+        'cv_id', 'user_id', 'filename', 'file_size', 'file_type', 'status',
+        'analysis_timestamp', 'created_at', 'updated_at',
+        'skill_name', 'experience_years', 'job_title', 'education_level', 'location'
+    )
+    _LIST_GETTER = attrgetter(*LIST_FIELDS)
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary"""
-        return {
-            'cv_id': self.cv_id,
-            'user_id': self.user_id,
-            'filename': self.filename,
-            'file_size': self.file_size,
-            'file_type': self.file_type,
-            's3_key': self.s3_key,
-            's3_url': self.s3_url,
-            'analysis_result': self.analysis_result,
-            'raw_content': self.raw_content,
-            'status': self.status,
-            'textract_job_id': self.textract_job_id,
-            'analysis_timestamp': self.analysis_timestamp.isoformat() if self.analysis_timestamp else None,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat(),
-            'skill_name': self.skill_name,
-            'skill_level': self.skill_level,
-            'experience_years': self.experience_years,
-            'job_title': self.job_title,
-            'education_level': self.education_level,
-            'degree': self.degree,
-            'location': self.location
-        }
+        data = dict(zip(self._DICT_FIELDS, self._DICT_GETTER(self)))
+        data['analysis_result'] = _map_to_dict(self.analysis_result)
+        data['raw_content'] = _map_to_dict(self.raw_content)
+        data['analysis_timestamp'] = self.analysis_timestamp.isoformat() if self.analysis_timestamp else None
+        data['created_at'] = self.created_at.isoformat()
+        data['updated_at'] = self.updated_at.isoformat()
+        return data
+    
+    def list_to_dict(self) -> Dict[str, Any]:
+        """Convert to a lightweight dictionary for list views (item loaded with LIST_FIELDS)"""
+        data = dict(zip(self.LIST_FIELDS, self._LIST_GETTER(self)))
+        for key in ('analysis_timestamp', 'created_at', 'updated_at'):
+            if data[key]:
+                data[key] = data[key].isoformat()
+        return data
     
     def update_analysis(self, analysis: CVAnalysis, content: CVContent, textract_job_id: Optional[str] = None):
         """Update CV với analysis result"""
-        self.analysis_result = analysis.dict()
-        self.raw_content = content.dict()
+        # Serialize each model exactly once; callers reuse these dicts via to_dict()
+        self.analysis_result = analysis.model_dump(mode='json')
+        self.raw_content = content.model_dump(mode='json')
         self.status = "analyzed"
         self.textract_job_id = textract_job_id
         self.analysis_timestamp = datetime.utcnow()
         self.updated_at = datetime.utcnow()
         
         # Update searchable fields
-        if analysis.personal_info and analysis.personal_info.contact_info:
-            self.location = analysis.personal_info.contact_info.location
+        if analysis.personal_info and analysis.personal_info.contact:
+            self.location = analysis.personal_info.contact.city
         
         if analysis.work_experience:
             # Get total experience years
-            total_years = 0
-            for exp in analysis.work_experience:
-                if exp.date_range and exp.date_range.start_date and exp.date_range.end_date:
-                    years = (exp.date_range.end_date - exp.date_range.start_date).days / 365.25
-                    total_years += years
-            self.experience_years = int(total_years)
+            total_days = sum(
+                (exp.end_date - exp.start_date).days
+                for exp in analysis.work_experience
+                if exp.start_date and exp.end_date
+            )
+            self.experience_years = int(total_days / 365.25)
             
             # Get latest job title
             if analysis.work_experience:
                 latest_exp = analysis.work_experience[0]
-                self.job_title = latest_exp.title
+                self.job_title = latest_exp.position
         
         if analysis.education:
             # Get highest education level
@@ -190,6 +247,13 @@ class CVTable(Model):
             self.skill_level = primary_skill.level
 
 
+def batch_save_cvs(items: List[CVTable]) -> None:
+    """Lưu nhiều CV records bằng BatchWriteItem (PynamoDB tự chia thành các request 25 items)"""
+    with CVTable.batch_write() as batch:
+        for item in items:
+            batch.save(item)
+
+
 class CVSearchTable(Model):
     """DynamoDB table cho CV search và analytics"""
     
@@ -198,6 +262,7 @@ class CVSearchTable(Model):
         region = settings.aws_region
         aws_access_key_id = settings.aws_access_key_id
         aws_secret_access_key = settings.aws_secret_access_key
+        max_pool_connections = settings.dynamodb_max_pool_connections
         read_capacity_units = 5
         write_capacity_units = 5
     
@@ -213,6 +278,21 @@ class CVSearchTable(Model):
     created_at = UTCDateTimeAttribute(default=datetime.utcnow)
     result_count = NumberAttribute(default=0)
     search_type = UnicodeAttribute()  # skills, experience, education, location, combined
+    
+    # Indexes
+    user_created_at_index = CVSearchUserIndex()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary"""
+        return {
+            'search_id': self.search_id,
+            'user_id': self.user_id,
+            'search_criteria': self.search_criteria,
+            'search_results': self.search_results,
+            'created_at': self.created_at.isoformat(),
+            'result_count': self.result_count,
+            'search_type': self.search_type
+        }
 
 
 class CVAnalyticsTable(Model):
@@ -223,22 +303,41 @@ class CVAnalyticsTable(Model):
         region = settings.aws_region
         aws_access_key_id = settings.aws_access_key_id
         aws_secret_access_key = settings.aws_secret_access_key
+        max_pool_connections = settings.dynamodb_max_pool_connections
         read_capacity_units = 5
         write_capacity_units = 5
     
-    # Primary key
+    # Primary key (analytics_id = user_id, một rollup row cho mỗi user)
     analytics_id = UnicodeAttribute(hash_key=True)
     user_id = UnicodeAttribute()
     
-    # Analytics data
+    # Analytics data - counters được cập nhật atomic (ADD / if_not_exists) khi CV thay đổi
     total_cvs = NumberAttribute(default=0)
     analyzed_cvs = NumberAttribute(default=0)
-    average_completeness = NumberAttribute(default=0.0)
-    average_quality = NumberAttribute(default=0.0)
-    skill_distribution = JSONAttribute()
-    experience_distribution = JSONAttribute()
-    education_distribution = JSONAttribute()
+    completeness_total = NumberAttribute(default=0)
+    completeness_count = NumberAttribute(default=0)
+    quality_total = NumberAttribute(default=0)
+    quality_count = NumberAttribute(default=0)
+    skill_distribution = MapAttribute(default=dict)
+    experience_distribution = MapAttribute(default=dict)
+    education_distribution = MapAttribute(default=dict)
     
     # Metadata
     created_at = UTCDateTimeAttribute(default=datetime.utcnow)
     updated_at = UTCDateTimeAttribute(default=datetime.utcnow)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to analytics response dictionary"""
+        def distribution(counts):
+            # Counter về 0 sau khi CV bị xóa vẫn còn trong map, bỏ qua chúng
+            return {key: int(count) for key, count in _map_to_dict(counts).items() if count > 0}
+        
+        return {
+            'total_cvs': int(self.total_cvs or 0),
+            'analyzed_cvs': int(self.analyzed_cvs or 0),
+            'average_completeness': self.completeness_total / self.completeness_count if self.completeness_count else 0.0,
+            'average_quality': self.quality_total / self.quality_count if self.quality_count else 0.0,
+            'skill_distribution': distribution(self.skill_distribution),
+            'experience_distribution': distribution(self.experience_distribution),
+            'education_distribution': distribution(self.education_distribution)
+        }
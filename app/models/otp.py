@@ -1,15 +1,16 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from pynamodb.models import Model
-from pynamodb.attributes import UnicodeAttribute, UTCDateTimeAttribute, NumberAttribute
+from pynamodb.attributes import UnicodeAttribute, UTCDateTimeAttribute, NumberAttribute, BooleanAttribute
+from pynamodb.indexes import GlobalSecondaryIndex, AllProjection
 from app.core.config import settings
-import uuid
-import random
+from app.utils.ids import fast_uuid4_str
+import secrets
 
 
 class OTPVerification(BaseModel):
-    otp_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    otp_id: str = Field(default_factory=fast_uuid4_str)
     email: str
     otp_code: str
     user_id: str
@@ -18,8 +19,12 @@ class OTPVerification(BaseModel):
     attempts: int = 0
     is_used: bool = False
     
-    class Config:
-        use_enum_values = True
+    model_config = ConfigDict(use_enum_values=True, extra='forbid', frozen=True, validate_assignment=False)
+    
+    @classmethod
+    def from_dynamo(cls, item: dict) -> "OTPVerification":
+        """Build from a trusted DynamoDB row without re-running validation"""
+        return cls.model_construct(**item)
 
 
 class OTPTable(Model):
@@ -27,12 +32,28 @@ class OTPTable(Model):
     class Meta:
         table_name = "otp_verifications"
         region = settings.dynamodb_region
+        max_pool_connections = settings.dynamodb_max_pool_connections
         if settings.dynamodb_endpoint_url:
             host = settings.dynamodb_endpoint_url
         if settings.aws_access_key_id and settings.aws_secret_access_key:
             aws_access_key_id = settings.aws_access_key_id
             aws_secret_access_key = settings.aws_secret_access_key
 
+    class EmailIndex(GlobalSecondaryIndex):
+        class Meta:
+            index_name = "email-created_at-index"
+            projection = AllProjection()
+            region = settings.dynamodb_region
+            read_capacity_units = 1
+            write_capacity_units = 1
+            if settings.dynamodb_endpoint_url:
+                host = settings.dynamodb_endpoint_url
+            if settings.aws_access_key_id and settings.aws_secret_access_key:
+                aws_access_key_id = settings.aws_access_key_id
+                aws_secret_access_key = settings.aws_secret_access_key
+        email = UnicodeAttribute(hash_key=True)
+        created_at = UTCDateTimeAttribute(range_key=True)
+
     otp_id = UnicodeAttribute(hash_key=True)
     email = UnicodeAttribute()
     otp_code = UnicodeAttribute()
@@ -40,14 +61,30 @@ class OTPTable(Model):
     expires_at = UTCDateTimeAttribute()
     created_at = UTCDateTimeAttribute()
     attempts = NumberAttribute(default=0)
-    is_used = UnicodeAttribute(default="false")  # DynamoDB doesn't have native boolean, use string
+    is_used = BooleanAttribute(default=False)
+    # Epoch seconds; DynamoDB TTL xóa record sau thời điểm này
+    ttl = NumberAttribute(null=True)
+    email_index = EmailIndex()
+
+
+_OTP_BASE = 100_000
+_OTP_RANGE = 900_000
 
 
 def generate_otp_code() -> str:
-    """Generate a 6-digit OTP code"""
-    return f"{random.randint(100000, 999999)}"
+    """Generate a 6-digit OTP code (CSPRNG-backed)"""
+    return f"{_OTP_BASE + secrets.randbelow(_OTP_RANGE):06d}"
 
 
 def create_otp_expiry() -> datetime:
     """Create OTP expiry time (15 minutes from now)"""
-    return datetime.utcnow() + timedelta(minutes=15)
\ No newline at end of file
+    return datetime.utcnow() + timedelta(minutes=15)
+
+
+# Giữ OTP đã hết hạn thêm 1 ngày (debug / audit) trước khi TTL xóa
+_OTP_RETENTION = timedelta(days=1)
+
+
+def otp_ttl(expires_at: datetime) -> int:
+    """Epoch seconds cho TTL attribute của OTP record (expires_at là naive UTC)"""
+    return int((expires_at + _OTP_RETENTION).replace(tzinfo=timezone.utc).timestamp())
\ No newline at end of file
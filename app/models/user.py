@@ -1,14 +1,59 @@
-from datetime import datetime
-from typing import Optional, List
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Optional, List, Union
 from enum import Enum
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from pynamodb.models import Model
 from pynamodb.attributes import (
-    UnicodeAttribute, BooleanAttribute, UTCDateTimeAttribute
+    Attribute, UnicodeAttribute, BooleanAttribute, UTCDateTimeAttribute
 )
-from pynamodb.indexes import GlobalSecondaryIndex, AllProjection
+from pynamodb.constants import NUMBER, STRING
+from pynamodb.indexes import GlobalSecondaryIndex, AllProjection, KeysOnlyProjection
 from app.core.config import settings
-import uuid
+from app.utils.ids import fast_uuid4_str
+import re
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ONE_MICROSECOND = timedelta(microseconds=1)
+# Format written by UTCDateTimeAttribute (rows created before epoch storage)
+_DYNAMO_DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f%z'
+
+
+def parse_dynamo_datetime(value: Union[str, int, Decimal]) -> datetime:
+    """Decode a stored timestamp: epoch microseconds, or a legacy UTCDateTimeAttribute string"""
+    if not isinstance(value, str) or value.isdigit():
+        return _EPOCH + timedelta(microseconds=int(value))
+    # Fast path for the canonical legacy form: 2024-01-31T12:34:56.123456+0000
+    if len(value) == 31 and value.endswith('+0000'):
+        return datetime(
+            int(value[0:4]), int(value[5:7]), int(value[8:10]),
+            int(value[11:13]), int(value[14:16]), int(value[17:19]), int(value[20:26]),
+            tzinfo=timezone.utc
+        )
+    return datetime.strptime(value, _DYNAMO_DATETIME_FORMAT)
+
+
+class EpochMicrosDateTimeAttribute(Attribute[datetime]):
+    """UTC datetime stored as integer epoch microseconds (N).
+
+    Also reads the S values written by UTCDateTimeAttribute, so this can be deployed
+    before `scripts/migrate_data.py --migrate-user-timestamps` rewrites them.
+    """
+    attr_type = NUMBER
+
+    def get_value(self, value: dict) -> str:
+        if STRING in value:
+            return value[STRING]
+        return super().get_value(value)
+
+    def serialize(self, value: datetime) -> str:
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return str((value - _EPOCH) // _ONE_MICROSECOND)
+
+    def deserialize(self, value: str) -> datetime:
+        return parse_dynamo_datetime(value)
 
 
 class UserRole(str, Enum):
@@ -24,9 +69,12 @@ class UserStatus(str, Enum):
     SUSPENDED = "suspended"
 
 
+_EMAIL_RE = re.compile(r'^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$')
+
+
 class User(BaseModel):
-    user_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    email: EmailStr
+    user_id: str = Field(default_factory=fast_uuid4_str)
+    email: str
     password_hash: str
     full_name: str
     phone: Optional[str] = None
@@ -37,12 +85,24 @@ class User(BaseModel):
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     last_login: Optional[datetime] = None
     
-    class Config:
-        use_enum_values = True
+    model_config = ConfigDict(use_enum_values=True, validate_assignment=False)
+    
+    @field_validator('email')
+    @classmethod
+    def validate_email(cls, v: str) -> str:
+        # API requests are already checked with EmailStr in app.schemas.user
+        if not _EMAIL_RE.match(v):
+            raise ValueError('Invalid email address')
+        return v
+    
+    @classmethod
+    def from_dynamo(cls, item: dict) -> "User":
+        """Build from a trusted DynamoDB row without re-running validation"""
+        return cls.model_construct(**item)
 
 
 class UserSession(BaseModel):
-    session_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    session_id: str = Field(default_factory=fast_uuid4_str)
     user_id: str
     access_token: str
     refresh_token: str
@@ -50,8 +110,13 @@ class UserSession(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     is_active: bool = True
     
-    class Config:
-        use_enum_values = True
+    # Not frozen: sessions are deactivated in place
+    model_config = ConfigDict(use_enum_values=True, extra='forbid', validate_assignment=False)
+    
+    @classmethod
+    def from_dynamo(cls, item: dict) -> "UserSession":
+        """Build from a trusted DynamoDB row without re-running validation"""
+        return cls.model_construct(**item)
 
 
 class UserTable(Model):
@@ -59,6 +124,7 @@ class UserTable(Model):
     class Meta:
         table_name = "users"
         region = settings.dynamodb_region
+        max_pool_connections = settings.dynamodb_max_pool_connections
         if settings.dynamodb_endpoint_url:
             host = settings.dynamodb_endpoint_url
         if settings.aws_access_key_id and settings.aws_secret_access_key:
@@ -68,7 +134,8 @@ class UserTable(Model):
     class EmailIndex(GlobalSecondaryIndex):
         class Meta:
             index_name = "email-index"
-            projection = AllProjection()
+            # Only resolves email -> user_id; full rows come from the table (and its cache)
+            projection = KeysOnlyProjection()
             region = settings.dynamodb_region
             read_capacity_units = 1
             write_capacity_units = 1
@@ -87,9 +154,9 @@ class UserTable(Model):
     role = UnicodeAttribute()
     status = UnicodeAttribute()
     email_verified = BooleanAttribute(default=False)
-    created_at = UTCDateTimeAttribute()
-    updated_at = UTCDateTimeAttribute()
-    last_login = UTCDateTimeAttribute(null=True)
+    created_at = EpochMicrosDateTimeAttribute()
+    updated_at = EpochMicrosDateTimeAttribute()
+    last_login = EpochMicrosDateTimeAttribute(null=True)
     email_index = EmailIndex()
 
 
@@ -98,6 +165,7 @@ class UserSessionTable(Model):
     class Meta:
         table_name = "user_sessions"
         region = settings.dynamodb_region
+        max_pool_connections = settings.dynamodb_max_pool_connections
         if settings.dynamodb_endpoint_url:
             host = settings.dynamodb_endpoint_url
         if settings.aws_access_key_id and settings.aws_secret_access_key:
@@ -118,6 +186,21 @@ class UserSessionTable(Model):
                 aws_secret_access_key = settings.aws_secret_access_key
         user_id = UnicodeAttribute(hash_key=True)
 
+    class ActiveUserIdIndex(GlobalSecondaryIndex):
+        # Sparse: only sessions that carry active_user_id (i.e. active ones) are indexed
+        class Meta:
+            index_name = "active-user-id-index"
+            projection = AllProjection()
+            region = settings.dynamodb_region
+            read_capacity_units = 1
+            write_capacity_units = 1
+            if settings.dynamodb_endpoint_url:
+                host = settings.dynamodb_endpoint_url
+            if settings.aws_access_key_id and settings.aws_secret_access_key:
+                aws_access_key_id = settings.aws_access_key_id
+                aws_secret_access_key = settings.aws_secret_access_key
+        active_user_id = UnicodeAttribute(hash_key=True)
+
     session_id = UnicodeAttribute(hash_key=True)
     user_id = UnicodeAttribute()
     access_token = UnicodeAttribute()
@@ -125,4 +208,7 @@ class UserSessionTable(Model):
     expires_at = UTCDateTimeAttribute()
     created_at = UTCDateTimeAttribute()
     is_active = BooleanAttribute(default=True)
+    # Set to user_id while the session is active, removed on deactivation
+    active_user_id = UnicodeAttribute(null=True)
     user_id_index = UserIdIndex()
+    active_user_id_index = ActiveUserIdIndex()
@@ -1,18 +1,169 @@
 """
 Repository layer cho CV storage operations
 """
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+from collections import Counter
 from datetime import datetime, timedelta
+import asyncio
+import base64
+import json
 import logging
 from boto3.dynamodb.conditions import Key, Attr
 from botocore.exceptions import ClientError
+from pynamodb.constants import ALL_OLD, ATTRIBUTES
+from pynamodb.exceptions import PutError, UpdateError
 
-from app.models.cv_storage import CVTable, CVSearchTable, CVAnalyticsTable
+from app.models.cv_storage import CVTable, CVSearchTable, CVAnalyticsTable, batch_save_cvs
 from app.models.cv import CVAnalysis, CVContent
+from app.utils.cache import TTLCache, MISS
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Read-through cache cho get_cv_by_id: CV hầu như không đổi sau khi analyzed.
+# Not-found được cache ngắn hơn để CV vừa tạo sớm xuất hiện.
+_cv_cache = TTLCache(maxsize=10_000, ttl=60, negative_ttl=5)
+
+
+def _encode_cursor(last_evaluated_key: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Đóng gói LastEvaluatedKey thành cursor string (base64 JSON) để trả cho client"""
+    if not last_evaluated_key:
+        return None
+    raw = json.dumps(last_evaluated_key, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def _decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Giải mã cursor từ client về LastEvaluatedKey"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid pagination cursor")
+    if not isinstance(key, dict):
+        raise ValueError("Invalid pagination cursor")
+    return key
+
+
+# Attributes mà analytics rollup cần từ mỗi CV
+_ANALYTICS_FIELDS = ('cv_id', 'status', 'analysis_result', 'experience_years', 'education_level')
+
+
+# Attributes mà CVTable.update_analysis có thể ghi
+_ANALYSIS_UPDATE_FIELDS = (
+    'analysis_result', 'raw_content', 'status', 'textract_job_id', 'analysis_timestamp', 'updated_at',
+    'location', 'experience_years', 'job_title', 'education_level', 'degree', 'skill_name', 'skill_level'
+)
+
+
+def _update_cv_returning_old(cv_id: str, changes: Dict[str, Any]) -> CVTable:
+    """Ghi changes bằng một UpdateItem (điều kiện CV tồn tại), trả về CV trước khi update.
+    
+    Dùng ReturnValues=ALL_OLD để vẫn có trạng thái cũ cho analytics delta mà không cần GetItem trước.
+    Giá trị None được ghi bằng REMOVE (xóa attribute cũ).
+    """
+    actions = [
+        getattr(CVTable, name).remove() if value is None else getattr(CVTable, name).set(value)
+        for name, value in changes.items()
+    ]
+    try:
+        data = CVTable._get_connection().update_item(
+            cv_id, actions=actions, condition=CVTable.cv_id.exists(), return_values=ALL_OLD
+        )
+    except UpdateError as e:
+        if e.cause_response_code == 'ConditionalCheckFailedException':
+            raise CVTable.DoesNotExist()
+        raise
+    return CVTable.from_raw_data(data[ATTRIBUTES])
+
+
+def _analytics_contribution(cv: Dict[str, Any]) -> Dict[str, Any]:
+    """Phần đóng góp của một CV vào analytics rollup (chỉ CV đã analyzed mới được tính)"""
+    analysis = cv.get('analysis_result')
+    if cv.get('status') != 'analyzed' or not analysis:
+        return {}
+    
+    return {
+        'analyzed_cvs': 1,
+        'completeness': analysis.get('completeness_score'),
+        'quality': analysis.get('quality_score'),
+        'skills': Counter(skill.get('name', 'Unknown') for skill in analysis.get('skills') or ()),
+        'experience': Counter([str(cv['experience_years'])] if cv.get('experience_years') else ()),
+        'education': Counter([cv['education_level']] if cv.get('education_level') else ())
+    }
+
+
+def _analytics_actions(old: Dict[str, Any], new: Dict[str, Any], total_delta: int = 0) -> list:
+    """Update actions (atomic) để chuyển rollup từ đóng góp cũ sang đóng góp mới"""
+    actions = []
+    if total_delta:
+        actions.append(CVAnalyticsTable.total_cvs.add(total_delta))
+    
+    analyzed_delta = new.get('analyzed_cvs', 0) - old.get('analyzed_cvs', 0)
+    if analyzed_delta:
+        actions.append(CVAnalyticsTable.analyzed_cvs.add(analyzed_delta))
+    
+    for key, total_attr, count_attr in (
+        ('completeness', CVAnalyticsTable.completeness_total, CVAnalyticsTable.completeness_count),
+        ('quality', CVAnalyticsTable.quality_total, CVAnalyticsTable.quality_count)
+    ):
+        old_score, new_score = old.get(key), new.get(key)
+        score_delta = (new_score or 0) - (old_score or 0)
+        count_delta = (new_score is not None) - (old_score is not None)
+        if score_delta:
+            actions.append(total_attr.add(score_delta))
+        if count_delta:
+            actions.append(count_attr.add(count_delta))
+    
+    for key, map_attr in (
+        ('skills', CVAnalyticsTable.skill_distribution),
+        ('experience', CVAnalyticsTable.experience_distribution),
+        ('education', CVAnalyticsTable.education_distribution)
+    ):
+        diff = Counter(new.get(key, {}))
+        diff.subtract(old.get(key, {}))
+        for name, delta in diff.items():
+            if delta:
+                # ADD không dùng được cho nested path -> SET path = if_not_exists(path, 0) + delta
+                path = map_attr[name]
+                actions.append(path.set((path | 0) + delta))
+    
+    return actions
+
+
+def _analytics_initial_row(
+    user_id: str, old: Dict[str, Any], new: Dict[str, Any], total_delta: int = 0
+) -> CVAnalyticsTable:
+    """Rollup row mới (tính từ 0) đã bao gồm delta này, dùng khi user chưa có row.
+    
+    User có CV từ trước khi có rollup phải được backfill (migrate_data.py --backfill-cv-analytics)
+    trước khi deploy, nếu không row này chỉ phản ánh một delta.
+    """
+    totals = {
+        'total_cvs': total_delta,
+        'analyzed_cvs': new.get('analyzed_cvs', 0) - old.get('analyzed_cvs', 0)
+    }
+    for key in ('completeness', 'quality'):
+        old_score, new_score = old.get(key), new.get(key)
+        totals[f'{key}_total'] = (new_score or 0) - (old_score or 0)
+        totals[f'{key}_count'] = (new_score is not None) - (old_score is not None)
+    
+    distributions = {}
+    for key, attr_name in (
+        ('skills', 'skill_distribution'),
+        ('experience', 'experience_distribution'),
+        ('education', 'education_distribution')
+    ):
+        diff = Counter(new.get(key, {}))
+        diff.subtract(old.get(key, {}))
+        distributions[attr_name] = {name: count for name, count in diff.items() if count > 0}
+    
+    return CVAnalyticsTable(
+        analytics_id=user_id,
+        user_id=user_id,
+        **{name: max(value, 0) for name, value in totals.items()},
+        **distributions
+    )
+
 
 class CVStorageRepository:
     """Repository cho CV storage operations"""
@@ -22,6 +173,11 @@ class CVStorageRepository:
         self.search_table = CVSearchTable
         self.analytics_table = CVAnalyticsTable
     
+    def warm_up(self) -> None:
+        """Mở sẵn connection (DNS, TLS) tới DynamoDB để request đầu tiên không chịu cold start"""
+        for table in (self.cv_table, self.search_table, self.analytics_table):
+            table.describe_table()
+    
     async def create_cv_record(
         self, 
         cv_id: str, 
@@ -44,50 +200,110 @@ class CVStorageRepository:
                 s3_url=s3_url,
                 status="uploaded"
             )
-            cv_record.save()
+            await asyncio.to_thread(cv_record.save)
+            _cv_cache.invalidate(cv_id)
+            await asyncio.to_thread(self._apply_analytics_delta, user_id, {}, {}, 1)
             
-            logger.info(f"Created CV record: {cv_id} for user: {user_id}")
+            logger.info("Created CV record: %s for user: %s", cv_id, user_id)
             return cv_record.to_dict()
             
         except Exception as e:
-            logger.error(f"Failed to create CV record: {str(e)}")
+            logger.error("Failed to create CV record: %s", e)
+            raise
+    
+    async def bulk_create_cv_records(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Tạo nhiều CV records bằng BatchWriteItem (25 items / request) thay vì một PutItem mỗi CV
+        
+        Mỗi record có cùng các field như create_cv_record.
+        """
+        try:
+            cv_records = [CVTable(status="uploaded", **record) for record in records]
+            await asyncio.to_thread(batch_save_cvs, cv_records)
+            
+            for cv_record in cv_records:
+                _cv_cache.invalidate(cv_record.cv_id)
+            for user_id, count in Counter(cv_record.user_id for cv_record in cv_records).items():
+                await asyncio.to_thread(self._apply_analytics_delta, user_id, {}, {}, count)
+            
+            logger.info("Created %d CV records", len(cv_records))
+            return [cv_record.to_dict() for cv_record in cv_records]
+            
+        except Exception as e:
+            logger.error("Failed to bulk create CV records: %s", e)
             raise
     
     async def get_cv_by_id(self, cv_id: str) -> Optional[Dict[str, Any]]:
         """Lấy CV theo ID"""
+        cached = _cv_cache.get(cv_id)
+        if cached is not MISS:
+            # Trả bản copy: caller có thể sửa dict trả về
+            return dict(cached) if cached is not None else None
+        
         try:
-            cv_record = CVTable.get(cv_id)
-            return cv_record.to_dict()
+            cv_data = (await asyncio.to_thread(CVTable.get, cv_id)).to_dict()
+            _cv_cache.set(cv_id, cv_data)
+            return dict(cv_data)
         except CVTable.DoesNotExist:
-            logger.warning(f"CV not found: {cv_id}")
+            logger.warning("CV not found: %s", cv_id)
+            _cv_cache.set(cv_id, None)
             return None
         except Exception as e:
-            logger.error(f"Failed to get CV: {str(e)}")
+            logger.error("Failed to get CV: %s", e)
             raise
     
+    async def _query_index(self, index, hash_key, range_key_condition=None, limit: int = 50) -> List[CVTable]:
+        """Chạy GSI query (PynamoDB sync) trong thread pool để có thể gather nhiều query song song"""
+        return await asyncio.to_thread(
+            lambda: list(index.query(hash_key, range_key_condition=range_key_condition, limit=limit))
+        )
+    
+    def _fetch_full_cvs(self, index_items) -> List[Dict[str, Any]]:
+        """Lấy CV items (list fields) cho kết quả query từ KEYS_ONLY index (giữ nguyên thứ tự)"""
+        cv_ids = list(dict.fromkeys(item.cv_id for item in index_items))
+        if not cv_ids:
+            return []
+        
+        cvs_by_id = {cv.cv_id: cv for cv in CVTable.batch_get(cv_ids, attributes_to_get=CVTable.LIST_FIELDS)}
+        return [cvs_by_id[cv_id].list_to_dict() for cv_id in cv_ids if cv_id in cvs_by_id]
+    
+    def _query_user_cvs_page(
+        self, user_id: str, limit: int, last_evaluated_key: Optional[Dict[str, Any]] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Một trang CV của user (mới nhất trước) cùng LastEvaluatedKey của trang đó"""
+        response = CVTable.user_id_index.query(
+            user_id,
+            limit=limit,
+            scan_index_forward=False,  # Sort by created_at desc
+            attributes_to_get=CVTable.LIST_FIELDS,
+            last_evaluated_key=last_evaluated_key
+        )
+        cvs = [item.list_to_dict() for item in response]
+        return cvs, response.last_evaluated_key
+    
     async def get_user_cvs(self, user_id: str, limit: int = 50, last_key: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
         """Lấy danh sách CV của user"""
         try:
-            query_kwargs = {
-                'user_id': user_id,
-                'limit': limit,
-                'scan_index_forward': False  # Sort by created_at desc
-            }
-            
-            if last_key:
-                query_kwargs['last_evaluated_key'] = last_key
-            
-            response = CVTable.user_id_index.query(**query_kwargs)
-            
-            cvs = [item.to_dict() for item in response]
-            next_key = response.last_evaluated_key.get('cv_id') if response.last_evaluated_key else None
-            
-            return cvs, next_key
+            # GSI cursor cần đủ cv_id + user_id + created_at, không chỉ cv_id
+            last_evaluated_key = _decode_cursor(last_key) if last_key else None
+            cvs, next_key = await asyncio.to_thread(self._query_user_cvs_page, user_id, limit, last_evaluated_key)
+            return cvs, _encode_cursor(next_key)
             
         except Exception as e:
-            logger.error(f"Failed to get user CVs: {str(e)}")
+            logger.error("Failed to get user CVs: %s", e)
             raise
     
+    async def iter_user_cvs(self, user_id: str, page_size: int = 100) -> AsyncIterator[Dict[str, Any]]:
+        """Duyệt toàn bộ CV của user theo từng trang, yield ngay khi mỗi trang về (không gom cả list)"""
+        last_evaluated_key = None
+        while True:
+            cvs, last_evaluated_key = await asyncio.to_thread(
+                self._query_user_cvs_page, user_id, page_size, last_evaluated_key
+            )
+            for cv in cvs:
+                yield cv
+            if not last_evaluated_key:
+                break
+    
     async def update_cv_analysis(
         self, 
         cv_id: str, 
@@ -97,61 +313,83 @@ class CVStorageRepository:
     ) -> Dict[str, Any]:
         """Cập nhật CV với analysis result"""
         try:
-            cv_record = CVTable.get(cv_id)
-            cv_record.update_analysis(analysis, content, textract_job_id)
-            cv_record.save()
+            staged = CVTable(cv_id)
+            staged.update_analysis(analysis, content, textract_job_id)
+            # None được giữ lại để REMOVE giá trị cũ (textract_job_id, searchable fields của lần analyze trước)
+            changes = {name: getattr(staged, name) for name in _ANALYSIS_UPDATE_FIELDS}
+            
+            cv_record = await asyncio.to_thread(_update_cv_returning_old, cv_id, changes)
+            _cv_cache.invalidate(cv_id)
+            old_contribution = _analytics_contribution(cv_record.to_dict())
+            for name, value in changes.items():
+                setattr(cv_record, name, value)
+            
+            cv_data = cv_record.to_dict()
+            await asyncio.to_thread(
+                self._apply_analytics_delta, cv_record.user_id, old_contribution, _analytics_contribution(cv_data)
+            )
             
-            logger.info(f"Updated CV analysis: {cv_id}")
-            return cv_record.to_dict()
+            logger.info("Updated CV analysis: %s", cv_id)
+            return cv_data
             
         except CVTable.DoesNotExist:
-            logger.warning(f"CV not found: {cv_id}")
+            logger.warning("CV not found: %s", cv_id)
             raise ValueError(f"CV not found: {cv_id}")
         except Exception as e:
-            logger.error(f"Failed to update CV analysis: {str(e)}")
+            logger.error("Failed to update CV analysis: %s", e)
             raise
     
     async def update_cv_status(self, cv_id: str, status: str, error_message: Optional[str] = None) -> Dict[str, Any]:
         """Cập nhật status của CV"""
         try:
-            cv_record = CVTable.get(cv_id)
-            cv_record.status = status
-            cv_record.updated_at = datetime.utcnow()
-            
+            changes = {'status': status, 'updated_at': datetime.utcnow()}
             if error_message:
-                cv_record.analysis_result = {"error": error_message}
+                changes['analysis_result'] = {"error": error_message}
             
-            cv_record.save()
+            cv_record = await asyncio.to_thread(_update_cv_returning_old, cv_id, changes)
+            _cv_cache.invalidate(cv_id)
+            old_contribution = _analytics_contribution(cv_record.to_dict())
+            for name, value in changes.items():
+                setattr(cv_record, name, value)
             
-            logger.info(f"Updated CV status: {cv_id} -> {status}")
-            return cv_record.to_dict()
+            cv_data = cv_record.to_dict()
+            await asyncio.to_thread(
+                self._apply_analytics_delta, cv_record.user_id, old_contribution, _analytics_contribution(cv_data)
+            )
+            
+            logger.info("Updated CV status: %s -> %s", cv_id, status)
+            return cv_data
             
         except CVTable.DoesNotExist:
-            logger.warning(f"CV not found: {cv_id}")
+            logger.warning("CV not found: %s", cv_id)
             raise ValueError(f"CV not found: {cv_id}")
         except Exception as e:
-            logger.error(f"Failed to update CV status: {str(e)}")
+            logger.error("Failed to update CV status: %s", e)
             raise
     
     async def delete_cv(self, cv_id: str, user_id: str) -> bool:
         """Xóa CV"""
         try:
-            cv_record = CVTable.get(cv_id)
+            cv_record = await asyncio.to_thread(CVTable.get, cv_id)
             
             # Verify ownership
             if cv_record.user_id != user_id:
                 raise ValueError("Unauthorized: CV does not belong to user")
             
-            cv_record.delete()
+            await asyncio.to_thread(cv_record.delete)
+            _cv_cache.invalidate(cv_id)
+            await asyncio.to_thread(
+                self._apply_analytics_delta, user_id, _analytics_contribution(cv_record.to_dict()), {}, -1
+            )
             
-            logger.info(f"Deleted CV: {cv_id}")
+            logger.info("Deleted CV: %s", cv_id)
             return True
             
         except CVTable.DoesNotExist:
-            logger.warning(f"CV not found: {cv_id}")
+            logger.warning("CV not found: %s", cv_id)
             return False
         except Exception as e:
-            logger.error(f"Failed to delete CV: {str(e)}")
+            logger.error("Failed to delete CV: %s", e)
             raise
     
     async def search_cvs_by_skills(
@@ -162,27 +400,21 @@ class CVStorageRepository:
     ) -> List[Dict[str, Any]]:
         """Tìm CV theo skills"""
         try:
-            cvs = []
-            
-            for skill in skills:
-                query_kwargs = {
-                    'skill_name': skill,
-                    'limit': limit
-                }
-                
-                if skill_level:
-                    query_kwargs['skill_level'] = skill_level
-                
-                response = CVTable.skills_index.query(**query_kwargs)
-                cvs.extend([item.to_dict() for item in response])
+            range_condition = CVTable.skill_level == skill_level if skill_level else None
             
-            # Remove duplicates
-            unique_cvs = {cv['cv_id']: cv for cv in cvs}.values()
+            # Query tất cả skills song song thay vì tuần tự
+            results = await asyncio.gather(*[
+                self._query_index(CVTable.skills_index, skill, range_condition, limit)
+                for skill in skills
+            ])
             
-            return list(unique_cvs)
+            # Remove duplicates and fetch full items
+            return await asyncio.to_thread(
+                self._fetch_full_cvs, [item for batch in results for item in batch]
+            )
             
         except Exception as e:
-            logger.error(f"Failed to search CVs by skills: {str(e)}")
+            logger.error("Failed to search CVs by skills: %s", e)
             raise
     
     async def search_cvs_by_experience(
@@ -194,28 +426,20 @@ class CVStorageRepository:
     ) -> List[Dict[str, Any]]:
         """Tìm CV theo experience"""
         try:
-            cvs = []
-            
-            # Query by experience years
-            for years in range(min_years, (max_years or min_years + 1) + 1):
-                query_kwargs = {
-                    'experience_years': years,
-                    'limit': limit
-                }
-                
-                if job_title:
-                    query_kwargs['job_title'] = job_title
-                
-                response = CVTable.experience_index.query(**query_kwargs)
-                cvs.extend([item.to_dict() for item in response])
-            
-            # Remove duplicates
-            unique_cvs = {cv['cv_id']: cv for cv in cvs}.values()
-            
-            return list(unique_cvs)
+            range_condition = CVTable.job_title == job_title if job_title else None
+            
+            # Query by experience years (song song)
+            results = await asyncio.gather(*[
+                self._query_index(CVTable.experience_index, years, range_condition, limit)
+                for years in range(min_years, (max_years or min_years + 1) + 1)
+            ])
+            
+            # Dedupe theo cv_id ngay khi gom kết quả, rồi fetch full items
+            cv_ids = {item.cv_id: item for batch in results for item in batch}
+            return await asyncio.to_thread(self._fetch_full_cvs, list(cv_ids.values()))
             
         except Exception as e:
-            logger.error(f"Failed to search CVs by experience: {str(e)}")
+            logger.error("Failed to search CVs by experience: %s", e)
             raise
     
     async def search_cvs_by_education(
@@ -226,21 +450,13 @@ class CVStorageRepository:
     ) -> List[Dict[str, Any]]:
         """Tìm CV theo education"""
         try:
-            query_kwargs = {
-                'education_level': education_level,
-                'limit': limit
-            }
-            
-            if degree:
-                query_kwargs['degree'] = degree
+            range_condition = CVTable.degree == degree if degree else None
+            index_items = await self._query_index(CVTable.education_index, education_level, range_condition, limit)
             
-            response = CVTable.education_index.query(**query_kwargs)
-            cvs = [item.to_dict() for item in response]
-            
-            return cvs
+            return await asyncio.to_thread(self._fetch_full_cvs, index_items)
             
         except Exception as e:
-            logger.error(f"Failed to search CVs by education: {str(e)}")
+            logger.error("Failed to search CVs by education: %s", e)
             raise
     
     async def search_cvs_by_location(
@@ -250,83 +466,107 @@ class CVStorageRepository:
     ) -> List[Dict[str, Any]]:
         """Tìm CV theo location"""
         try:
-            response = CVTable.location_index.query(
-                location=location,
-                limit=limit
-            )
-            cvs = [item.to_dict() for item in response]
+            index_items = await self._query_index(CVTable.location_index, location, limit=limit)
             
-            return cvs
+            return await asyncio.to_thread(self._fetch_full_cvs, index_items)
             
         except Exception as e:
-            logger.error(f"Failed to search CVs by location: {str(e)}")
+            logger.error("Failed to search CVs by location: %s", e)
             raise
     
+    def _apply_analytics_delta(
+        self,
+        user_id: str,
+        old_contribution: Dict[str, Any],
+        new_contribution: Dict[str, Any],
+        total_delta: int = 0
+    ) -> None:
+        """Cập nhật analytics rollup của user bằng atomic update (không read-modify-write)"""
+        actions = _analytics_actions(old_contribution, new_contribution, total_delta)
+        if not actions:
+            return
+        actions.append(CVAnalyticsTable.updated_at.set(datetime.utcnow()))
+        
+        def update() -> None:
+            CVAnalyticsTable(analytics_id=user_id).update(
+                actions=actions,
+                condition=CVAnalyticsTable.analytics_id.exists()
+            )
+        
+        try:
+            try:
+                update()
+            except UpdateError as e:
+                if e.cause_response_code != 'ConditionalCheckFailedException':
+                    raise
+                # Chưa có rollup row: tạo row chỉ với delta này (conditional put, không ghi đè ADD song song)
+                try:
+                    _analytics_initial_row(user_id, old_contribution, new_contribution, total_delta).save(
+                        condition=CVAnalyticsTable.analytics_id.does_not_exist()
+                    )
+                except PutError as put_error:
+                    if put_error.cause_response_code != 'ConditionalCheckFailedException':
+                        raise
+                    # Request khác vừa tạo row: row đã tồn tại, ADD lại
+                    update()
+        except Exception as e:
+            # Không làm hỏng thao tác CV chính; chỉ log lỗi rollup
+            logger.error("Failed to update CV analytics: %s", e)
+    
+    def rebuild_cv_analytics(self, user_id: str) -> CVAnalyticsTable:
+        """Tính analytics rollup từ toàn bộ CV của user cho user chưa có row (backfill).
+        
+        GSI là eventually consistent nên chỉ tạo row khi chưa có (conditional put), không
+        bao giờ ghi đè counters đang được cập nhật bởi _apply_analytics_delta.
+        """
+        # Scalar totals theo tên attribute của CVAnalyticsTable (Counter: key thiếu = 0)
+        totals = Counter(total_cvs=0, analyzed_cvs=0)
+        skills, experience, education = Counter(), Counter(), Counter()
+        
+        for item in CVTable.user_id_index.query(user_id, attributes_to_get=_ANALYTICS_FIELDS):
+            totals['total_cvs'] += 1
+            contribution = _analytics_contribution({field: getattr(item, field) for field in _ANALYTICS_FIELDS})
+            if not contribution:
+                continue
+            totals['analyzed_cvs'] += 1
+            for key in ('completeness', 'quality'):
+                if contribution[key] is not None:
+                    totals[f'{key}_total'] += contribution[key]
+                    totals[f'{key}_count'] += 1
+            skills.update(contribution['skills'])
+            experience.update(contribution['experience'])
+            education.update(contribution['education'])
+        
+        analytics = CVAnalyticsTable(
+            analytics_id=user_id,
+            user_id=user_id,
+            skill_distribution=dict(skills),
+            experience_distribution=dict(experience),
+            education_distribution=dict(education),
+            **totals
+        )
+        try:
+            analytics.save(condition=CVAnalyticsTable.analytics_id.does_not_exist())
+        except PutError as e:
+            if e.cause_response_code != 'ConditionalCheckFailedException':
+                raise
+            # Row vừa được tạo bởi delta path: dùng row đó
+            return CVAnalyticsTable.get(user_id, consistent_read=True)
+        return analytics
+    
     async def get_cv_analytics(self, user_id: str) -> Dict[str, Any]:
-        """Lấy analytics cho user"""
+        """Lấy analytics cho user (đọc rollup row, O(1))"""
         try:
-            # Get user CVs
-            user_cvs, _ = await self.get_user_cvs(user_id, limit=1000)
-            
-            if not user_cvs:
-                return {
-                    'total_cvs': 0,
-                    'analyzed_cvs': 0,
-                    'average_completeness': 0.0,
-                    'average_quality': 0.0,
-                    'skill_distribution': {},
-                    'experience_distribution': {},
-                    'education_distribution': {}
-                }
-            
-            # Calculate analytics
-            total_cvs = len(user_cvs)
-            analyzed_cvs = len([cv for cv in user_cvs if cv['status'] == 'analyzed'])
-            
-            completeness_scores = []
-            quality_scores = []
-            skills = {}
-            experience_years = {}
-            education_levels = {}
-            
-            for cv in user_cvs:
-                if cv['status'] == 'analyzed' and cv['analysis_result']:
-                    analysis = cv['analysis_result']
-                    
-                    # Scores
-                    if 'completeness_score' in analysis:
-                        completeness_scores.append(analysis['completeness_score'])
-                    if 'quality_score' in analysis:
-                        quality_scores.append(analysis['quality_score'])
-                    
-                    # Skills
-                    if 'skills' in analysis:
-                        for skill in analysis['skills']:
-                            skill_name = skill.get('name', 'Unknown')
-                            skills[skill_name] = skills.get(skill_name, 0) + 1
-                    
-                    # Experience
-                    if 'experience_years' in cv and cv['experience_years']:
-                        years = cv['experience_years']
-                        experience_years[years] = experience_years.get(years, 0) + 1
-                    
-                    # Education
-                    if 'education_level' in cv and cv['education_level']:
-                        level = cv['education_level']
-                        education_levels[level] = education_levels.get(level, 0) + 1
-            
-            return {
-                'total_cvs': total_cvs,
-                'analyzed_cvs': analyzed_cvs,
-                'average_completeness': sum(completeness_scores) / len(completeness_scores) if completeness_scores else 0.0,
-                'average_quality': sum(quality_scores) / len(quality_scores) if quality_scores else 0.0,
-                'skill_distribution': skills,
-                'experience_distribution': experience_years,
-                'education_distribution': education_levels
-            }
+            try:
+                analytics = await asyncio.to_thread(CVAnalyticsTable.get, user_id)
+            except CVAnalyticsTable.DoesNotExist:
+                # User cũ chưa có rollup row: backfill một lần (không ghi đè row đã có)
+                analytics = await asyncio.to_thread(self.rebuild_cv_analytics, user_id)
+            
+            return analytics.to_dict()
             
         except Exception as e:
-            logger.error(f"Failed to get CV analytics: {str(e)}")
+            logger.error("Failed to get CV analytics: %s", e)
             raise
     
     async def save_search_result(
@@ -347,30 +587,63 @@ class CVStorageRepository:
                 search_type=search_type,
                 result_count=len(search_results)
             )
-            search_record.save()
+            await asyncio.to_thread(search_record.save)
             
-            logger.info(f"Saved search result: {search_id}")
+            logger.info("Saved search result: %s", search_id)
             return search_record.to_dict()
             
         except Exception as e:
-            logger.error(f"Failed to save search result: {str(e)}")
+            logger.error("Failed to save search result: %s", e)
+            raise
+    
+    async def bulk_save_search_results(self, searches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Lưu nhiều search results bằng BatchWriteItem
+        
+        Mỗi phần tử có cùng các field như save_search_result.
+        """
+        try:
+            search_records = [
+                CVSearchTable(
+                    search_id=search['search_id'],
+                    user_id=search['user_id'],
+                    search_criteria=search['search_criteria'],
+                    search_results=search['search_results'],
+                    search_type=search['search_type'],
+                    result_count=len(search['search_results'])
+                )
+                for search in searches
+            ]
+            
+            def write_all():
+                with CVSearchTable.batch_write() as batch:
+                    for search_record in search_records:
+                        batch.save(search_record)
+            
+            await asyncio.to_thread(write_all)
+            
+            logger.info("Saved %d search results", len(search_records))
+            return [search_record.to_dict() for search_record in search_records]
+            
+        except Exception as e:
+            logger.error("Failed to bulk save search results: %s", e)
             raise
     
     async def get_recent_searches(self, user_id: str, limit: int = 20) -> List[Dict[str, Any]]:
         """Lấy recent searches của user"""
         try:
-            # This would require a GSI on user_id and created_at
-            # For now, we'll use scan with filter
-            response = CVSearchTable.scan(
-                CVSearchTable.user_id == user_id,
-                limit=limit
-            )
-            
-            searches = [item.to_dict() for item in response]
-            searches.sort(key=lambda x: x['created_at'], reverse=True)
+            # GSI user_id + created_at, DynamoDB trả về theo thứ tự mới nhất trước
+            items = await asyncio.to_thread(lambda: list(CVSearchTable.user_created_at_index.query(
+                user_id,
+                limit=limit,
+                scan_index_forward=False
+            )))
             
-            return searches
+            return [item.to_dict() for item in items]
             
         except Exception as e:
-            logger.error(f"Failed to get recent searches: {str(e)}")
+            logger.error("Failed to get recent searches: %s", e)
             raise
+
+
+# Global repository instance (dùng chung connection của các PynamoDB table)
+cv_storage_repository = CVStorageRepository()
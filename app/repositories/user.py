@@ -1,9 +1,37 @@
-from typing import Optional, List
-from datetime import datetime
+from typing import Iterator, Optional, List
+from datetime import datetime, timezone
+from pynamodb.transactions import TransactWrite
 from app.core.database import db_client
 from app.models.user import User, UserSession, UserTable, UserSessionTable
-from app.schemas.user import UserRole, UserStatus
-import json
+from app.utils.cache import TTLCache, MISS
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+_USER_FIELDS = (
+    'user_id', 'email', 'password_hash', 'full_name', 'phone', 'role', 'status',
+    'email_verified', 'created_at', 'updated_at', 'last_login'
+)
+_UPDATABLE_USER_FIELDS = frozenset(_USER_FIELDS) - {'user_id', 'created_at', 'updated_at'}
+# How _user_to_table stores an absent value; a None update writes this instead of a REMOVE
+_EMPTY_USER_VALUES = {'phone': ""}
+_SESSION_FIELDS = (
+    'session_id', 'user_id', 'access_token', 'refresh_token', 'expires_at', 'created_at', 'is_active'
+)
+
+# Deactivation also drops the session out of the sparse active-user-id-index
+_DEACTIVATE_SESSION_ACTIONS = [
+    UserSessionTable.is_active.set(False),
+    UserSessionTable.active_user_id.remove()
+]
+
+# get_user_by_id runs on every authenticated request; user rows rarely change.
+# Module-level so that writes through any UserRepository instance invalidate it.
+_user_cache = TTLCache(maxsize=10_000, ttl=30, negative_ttl=5)
+
+# Items per TransactWriteItems request
+_TRANSACT_CHUNK_SIZE = 25
 
 
 class UserRepository:
@@ -14,59 +42,105 @@ class UserRepository:
     def create_user(self, user: User) -> bool:
         """Create a new user"""
         try:
-            item = UserTable(
-                user_id=user.user_id,
-                email=user.email,
-                password_hash=user.password_hash,
-                full_name=user.full_name,
-                phone=user.phone or "",
-                role=user.role,
-                status=user.status,
-                email_verified=user.email_verified,
-                created_at=user.created_at,
-                updated_at=user.updated_at,
-                last_login=user.last_login
-            )
-            item.save()
+            item = self._user_to_table(user)
+            # Never overwrite an existing account
+            item.save(condition=UserTable.user_id.does_not_exist())
+            _user_cache.invalidate(user.user_id)
+            return True
+        except Exception as e:
+            logger.error("Error creating user: %s", e)
+            return False
+
+    def create_users_bulk(self, users: List[User]) -> bool:
+        """Create many users with BatchWriteItem (admin imports)
+
+        BatchWriteItem takes no conditions, so duplicate IDs/emails and accounts that
+        already exist are skipped up front. The check is not atomic with the write:
+        use create_user for sign-ups that may race.
+        """
+        try:
+            new_users = {}
+            emails = set()
+            for user in users:
+                if user.user_id in new_users or user.email in emails:
+                    continue
+                new_users[user.user_id] = user
+                emails.add(user.email)
+            for item in UserTable.batch_get(list(new_users), attributes_to_get=['user_id']):
+                del new_users[item.user_id]
+            new_users = {
+                user_id: user for user_id, user in new_users.items() if not self.email_exists(user.email)
+            }
+            if len(new_users) < len(users):
+                logger.warning("Skipped %d existing or duplicate users in bulk create", len(users) - len(new_users))
+
+            # batch_write() flushes every 25 items
+            with UserTable.batch_write() as batch:
+                for user in new_users.values():
+                    batch.save(self._user_to_table(user))
+            for user_id in new_users:
+                _user_cache.invalidate(user_id)
             return True
         except Exception as e:
-            print(f"Error creating user: {e}")
+            logger.error("Error creating users in bulk: %s", e)
             return False
 
     def get_user_by_id(self, user_id: str) -> Optional[User]:
         """Get user by ID"""
+        cached = _user_cache.get(user_id)
+        if cached is not MISS:
+            # Hand out a copy: callers may mutate the returned model
+            return cached.model_copy() if cached is not None else None
+
         try:
-            item = UserTable.get(user_id)
-            if item:
-                return self._table_to_user(item)
+            user = self._table_to_user(UserTable.get(user_id))
+            _user_cache.set(user_id, user)
+            return user.model_copy()
+        except UserTable.DoesNotExist:
+            _user_cache.set(user_id, None)
             return None
         except Exception as e:
-            print(f"Error getting user by ID: {e}")
+            logger.error("Error getting user by ID: %s", e)
             return None
 
-    def get_user_by_email(self, email: str) -> Optional[User]:
-        """Get user by email"""
+    def get_user_id_by_email(self, email: str) -> Optional[str]:
+        """Resolve an email to its user_id via the keys-only email index"""
         try:
-            # Query using GSI on email
-            # Query by GSI
-            for item in UserTable.email_index.query(email):
-                return self._table_to_user(item)
+            for item in UserTable.email_index.query(email, limit=1):
+                return item.user_id
             return None
         except Exception as e:
-            print(f"Error getting user by email: {e}")
+            logger.error("Error getting user ID by email: %s", e)
             return None
 
+    def get_user_by_email(self, email: str) -> Optional[User]:
+        """Get user by email"""
+        user_id = self.get_user_id_by_email(email)
+        return self.get_user_by_id(user_id) if user_id else None
+
     def update_user(self, user_id: str, update_data: dict) -> bool:
         """Update user information"""
         try:
-            item = UserTable.get(user_id)
+            # Aware UTC: EpochMicrosDateTimeAttribute serializes it without a tzinfo replace
+            actions = [UserTable.updated_at.set(datetime.now(timezone.utc))]
             for key, value in update_data.items():
-                setattr(item, key, value)
-            item.updated_at = datetime.utcnow()
-            item.save()
+                if key not in _UPDATABLE_USER_FIELDS:
+                    continue
+                attribute = getattr(UserTable, key)
+                if value is None:
+                    value = _EMPTY_USER_VALUES.get(key)
+                if value is not None:
+                    actions.append(attribute.set(value))
+                elif attribute.null:
+                    actions.append(attribute.remove())
+                else:
+                    raise ValueError(f"{key} is required and cannot be cleared")
+            # Targeted UpdateItem: no prior read, untouched attributes are not rewritten
+            UserTable(user_id).update(actions=actions, condition=UserTable.user_id.exists())
+            _user_cache.invalidate(user_id)
             return True
         except Exception as e:
-            print(f"Error updating user: {e}")
+            logger.error("Error updating user: %s", e)
             return False
 
     def delete_user(self, user_id: str) -> bool:
@@ -74,15 +148,19 @@ class UserRepository:
         try:
             item = UserTable.get(user_id)
             item.delete()
+            _user_cache.invalidate(user_id)
             return True
         except Exception as e:
-            print(f"Error deleting user: {e}")
+            logger.error("Error deleting user: %s", e)
             return False
 
+    def bust_cache(self) -> None:
+        """Drop all cached users (e.g. after an out-of-band admin change)"""
+        _user_cache.clear()
+
     def email_exists(self, email: str) -> bool:
         """Check if email already exists"""
-        user = self.get_user_by_email(email)
-        return user is not None
+        return self.get_user_id_by_email(email) is not None
 
     def create_session(self, session: UserSession) -> bool:
         """Create user session"""
@@ -94,12 +172,13 @@ class UserRepository:
                 refresh_token=session.refresh_token,
                 expires_at=session.expires_at,
                 created_at=session.created_at,
-                is_active=session.is_active
+                is_active=session.is_active,
+                active_user_id=session.user_id if session.is_active else None
             )
             item.save()
             return True
         except Exception as e:
-            print(f"Error creating session: {e}")
+            logger.error("Error creating session: %s", e)
             return False
 
     def get_session(self, session_id: str) -> Optional[UserSession]:
@@ -110,63 +189,85 @@ class UserRepository:
                 return self._table_to_session(item)
             return None
         except Exception as e:
-            print(f"Error getting session: {e}")
+            logger.error("Error getting session: %s", e)
             return None
 
+    def iter_user_sessions(self, user_id: str) -> Iterator[UserSession]:
+        """Lazily yield active sessions for a user, one query page at a time"""
+        # Sparse GSI: only active sessions are in it
+        for item in UserSessionTable.active_user_id_index.query(user_id):
+            yield self._table_to_session(item)
+
     def get_user_sessions(self, user_id: str) -> List[UserSession]:
         """Get all active sessions for a user"""
         try:
-            # Query by GSI
-            items = [self._table_to_session(it) for it in UserSessionTable.user_id_index.query(user_id)]
-            return [it for it in items if it.is_active]
+            return list(self.iter_user_sessions(user_id))
         except Exception as e:
-            print(f"Error getting user sessions: {e}")
+            logger.error("Error getting user sessions: %s", e)
             return []
 
     def deactivate_session(self, session_id: str) -> bool:
         """Deactivate a session"""
         try:
-            item = UserSessionTable.get(session_id)
-            item.is_active = False
-            item.save()
+            UserSessionTable(session_id).update(
+                actions=_DEACTIVATE_SESSION_ACTIONS,
+                condition=UserSessionTable.session_id.exists()
+            )
             return True
         except Exception as e:
-            print(f"Error deactivating session: {e}")
+            logger.error("Error deactivating session: %s", e)
             return False
 
     def deactivate_user_sessions(self, user_id: str) -> bool:
-        """Deactivate all sessions for a user"""
+        """Deactivate all sessions for a user (one transaction per 25 sessions)"""
         try:
-            sessions = self.get_user_sessions(user_id)
-            for session in sessions:
-                self.deactivate_session(session.session_id)
+            connection = UserSessionTable._get_connection().connection
+            # Flush while the query pages in: only session_ids are fetched and none are kept around
+            pending = []
+            for item in UserSessionTable.active_user_id_index.query(user_id, attributes_to_get=['session_id']):
+                pending.append(item.session_id)
+                if len(pending) == _TRANSACT_CHUNK_SIZE:
+                    self._deactivate_sessions_transaction(connection, pending)
+                    pending = []
+            if pending:
+                self._deactivate_sessions_transaction(connection, pending)
             return True
         except Exception as e:
-            print(f"Error deactivating user sessions: {e}")
+            logger.error("Error deactivating user sessions: %s", e)
             return False
 
-    def _table_to_user(self, item: UserTable) -> User:
-        return User(
-            user_id=item.user_id,
-            email=item.email,
-            password_hash=item.password_hash,
-            full_name=item.full_name,
-            phone=item.phone if item.phone else None,
-            role=item.role,
-            status=item.status,
-            email_verified=bool(item.email_verified),
-            created_at=item.created_at,
-            updated_at=item.updated_at,
-            last_login=item.last_login
+    def _deactivate_sessions_transaction(self, connection, session_ids: List[str]) -> None:
+        with TransactWrite(connection=connection) as transaction:
+            for session_id in session_ids:
+                transaction.update(
+                    UserSessionTable(session_id),
+                    actions=_DEACTIVATE_SESSION_ACTIONS,
+                    condition=UserSessionTable.session_id.exists()
+                )
+
+    def _user_to_table(self, user: User) -> UserTable:
+        return UserTable(
+            user_id=user.user_id,
+            email=user.email,
+            password_hash=user.password_hash,
+            full_name=user.full_name,
+            phone=user.phone or "",
+            role=user.role,
+            status=user.status,
+            email_verified=user.email_verified,
+            created_at=user.created_at,
+            updated_at=user.updated_at,
+            last_login=user.last_login
         )
 
+    def _table_to_user(self, item: UserTable) -> User:
+        # Rows were validated on write; skip pydantic validation on the read path
+        data = {field: getattr(item, field) for field in _USER_FIELDS}
+        data['phone'] = data['phone'] or None
+        data['email_verified'] = bool(data['email_verified'])
+        return User.from_dynamo(data)
+
     def _table_to_session(self, item: UserSessionTable) -> UserSession:
-        return UserSession(
-            session_id=item.session_id,
-            user_id=item.user_id,
-            access_token=item.access_token,
-            refresh_token=item.refresh_token,
-            expires_at=item.expires_at,
-            created_at=item.created_at,
-            is_active=bool(item.is_active)
-        )
+        data = {field: getattr(item, field) for field in _SESSION_FIELDS}
+        data['is_active'] = bool(data['is_active'])
+        return UserSession.from_dynamo(data)
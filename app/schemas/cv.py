@@ -9,10 +9,17 @@ from pydantic import BaseModel, Field
 
 from app.models.cv import (
     DocumentType, ExperienceLevel, EducationLevel, SkillCategory,
-    CVAnalysis, CVUpload, CVContent, CVAnalysisSummary, CVSearchFilters, CVMatchScore
+    CVAnalysis, CVUpload, CVContent, CVAnalysisSummary, CVSearchFilters, CVMatchScore,
+    CVSections, CVKeyInformation, CVQualityMetrics
 )
 
 
+class SkillCount(BaseModel):
+    """Số CV có một skill (dùng cho thống kê top skills)"""
+    name: str = Field(..., description="Skill name")
+    count: int = Field(..., ge=0, description="Number of CVs with this skill")
+
+
 class CVUploadRequest(BaseModel):
     """Request schema cho CV upload"""
     filename: str = Field(..., description="Original filename")
@@ -43,9 +50,9 @@ class TextExtractionResponse(BaseModel):
     extraction_id: str = Field(..., description="Extraction ID")
     text: str = Field(..., description="Extracted text")
     confidence: float = Field(..., description="Extraction confidence")
-    sections: Dict[str, str] = Field(default_factory=dict, description="Extracted sections")
-    key_information: Dict[str, Any] = Field(default_factory=dict, description="Key information")
-    quality_metrics: Dict[str, Any] = Field(default_factory=dict, description="Quality metrics")
+    sections: CVSections = Field(default_factory=dict, description="Extracted sections")
+    key_information: CVKeyInformation = Field(default_factory=dict, description="Key information")
+    quality_metrics: CVQualityMetrics = Field(default_factory=dict, description="Quality metrics")
     processing_time: float = Field(..., description="Processing time in seconds")
     extraction_timestamp: datetime = Field(..., description="Extraction timestamp")
 
@@ -152,7 +159,7 @@ class CVStatsResponse(BaseModel):
     total_analyses: int = Field(..., description="Total number of analyses")
     avg_quality_score: float = Field(..., description="Average quality score")
     avg_completeness_score: float = Field(..., description="Average completeness score")
-    top_skills: List[Dict[str, Any]] = Field(..., description="Most common skills")
+    top_skills: List[SkillCount] = Field(..., description="Most common skills")
     experience_distribution: Dict[str, int] = Field(..., description="Experience level distribution")
     education_distribution: Dict[str, int] = Field(..., description="Education level distribution")
     stats_timestamp: datetime = Field(..., description="Statistics timestamp")
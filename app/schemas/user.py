@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, Field, validator
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, model_validator
 from typing import Optional
 from enum import Enum
 from datetime import datetime
@@ -25,11 +25,11 @@ class UserRegisterRequest(BaseModel):
     phone: Optional[str] = Field(None, pattern=r'^[0-9+\-\s()]+$')
     role: UserRole = UserRole.CANDIDATE
 
-    @validator('confirm_password')
-    def passwords_match(cls, v, values):
-        if 'password' in values and v != values['password']:
+    @model_validator(mode='after')
+    def passwords_match(self):
+        if self.confirm_password != self.password:
             raise ValueError('Passwords do not match')
-        return v
+        return self
 
 
 class UserLoginRequest(BaseModel):
@@ -49,8 +49,7 @@ class UserResponse(BaseModel):
     updated_at: datetime
     last_login: Optional[datetime]
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class UserUpdateRequest(BaseModel):
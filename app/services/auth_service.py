@@ -1,4 +1,4 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Optional, Tuple
 from fastapi import HTTPException, status
 from app.core.security import (
@@ -252,18 +252,16 @@ class AuthService:
             
             # Tìm OTP record mới nhất cho user này
             try:
-                otp_records = []
-                for otp in OTPTable.scan(OTPTable.email == email):
-                    if otp.is_used == "false":
-                        otp_records.append(otp)
+                # Query GSI theo email, created_at giảm dần -> record đầu tiên là mới nhất
+                latest_otp = next(iter(OTPTable.email_index.query(
+                    email,
+                    scan_index_forward=False,
+                    filter_condition=OTPTable.is_used == False  # noqa: E712
+                )), None)
                 
-                if not otp_records:
+                if not latest_otp:
                     return False, "No valid OTP found. Please request a new one."
                 
-                # Sắp xếp theo thời gian tạo, lấy cái mới nhất
-                otp_records.sort(key=lambda x: x.created_at, reverse=True)
-                latest_otp = otp_records[0]
-                
                 # Kiểm tra OTP đã hết hạn chưa
                 current_time = datetime.utcnow()
                 expires_time = latest_otp.expires_at
@@ -287,7 +285,7 @@ class AuthService:
                     return False, f"Invalid OTP code. {3 - latest_otp.attempts} attempts remaining."
                 
                 # OTP đúng - kích hoạt tài khoản
-                latest_otp.is_used = "true"
+                latest_otp.is_used = True
                 latest_otp.save()
                 
                 # Cập nhật user status
@@ -385,7 +383,13 @@ class AuthService:
             # Check expiry
             expiry = match.get("reset_token_expiry")
             if isinstance(expiry, str):
-                expiry = datetime.fromisoformat(expiry.replace('Z', '+00:00'))
+                # Only a trailing Z needs rewriting (fromisoformat accepts it natively from 3.11)
+                if expiry.endswith('Z'):
+                    expiry = expiry[:-1] + '+00:00'
+                expiry = datetime.fromisoformat(expiry)
+                if expiry.tzinfo is not None:
+                    # Compared with naive utcnow() below
+                    expiry = expiry.astimezone(timezone.utc).replace(tzinfo=None)
             if not expiry or expiry < datetime.utcnow():
                 return False, "Reset token expired"
 
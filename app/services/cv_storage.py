@@ -1,12 +1,12 @@
 """
 Service layer cho CV storage business logic
 """
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
 import uuid
 import logging
 from datetime import datetime
 
-from app.repositories.cv_storage import CVStorageRepository
+from app.repositories.cv_storage import cv_storage_repository
 from app.models.cv import CVAnalysis, CVContent
 from app.services.textract import textract_service
 from app.services.s3 import s3_service
@@ -19,7 +19,7 @@ class CVStorageService:
     """Service cho CV storage business logic"""
     
     def __init__(self):
-        self.repository = CVStorageRepository()
+        self.repository = cv_storage_repository
         self.textract_service = textract_service
         self.s3_service = s3_service
     
@@ -128,8 +128,8 @@ class CVStorageService:
             return {
                 'success': True,
                 'cv_id': cv_id,
-                'analysis_result': analysis.dict(),
-                'raw_content': content.dict(),
+                'analysis_result': updated_cv['analysis_result'],
+                'raw_content': updated_cv['raw_content'],
                 'status': 'analyzed'
             }
             
@@ -159,6 +159,10 @@ class CVStorageService:
             logger.error(f"Failed to get user CVs: {str(e)}")
             raise
     
+    def iter_user_cvs(self, user_id: str, page_size: int = 100) -> AsyncIterator[Dict[str, Any]]:
+        """Stream toàn bộ CV của user (async iterator, từng trang DynamoDB)"""
+        return self.repository.iter_user_cvs(user_id, page_size)
+    
     async def delete_cv(self, cv_id: str, user_id: str) -> Dict[str, Any]:
         """Xóa CV"""
         try:
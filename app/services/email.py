@@ -16,7 +16,7 @@ import logging
 from app.core.config import settings
 from app.core.database import get_dynamodb_resource
 from app.utils.logger import get_logger
-from app.models.otp import OTPTable, generate_otp_code, create_otp_expiry
+from app.models.otp import OTPTable, generate_otp_code, create_otp_expiry, otp_ttl
 
 logger = get_logger(__name__)
 
@@ -64,7 +64,8 @@ class EmailService:
                 expires_at=expires_at,
                 created_at=datetime.utcnow(),
                 attempts=0,
-                is_used="false"
+                is_used=False,
+                ttl=otp_ttl(expires_at)
             )
             otp_record.save()
             
@@ -2,21 +2,378 @@
 Simple migration utilities for BE-005.
 
 Supported operations:
-  - backfill indexes (no-op for GSI as managed by AWS)
+  - add the OTP email-created_at-index to an existing otp_verifications table;
+    must run (and reach ACTIVE) before deploying the GSI-based verify_otp_code
   - normalize user phone/role/status fields if needed
+  - rewrite legacy "true"/"false" string OTP is_used flags as native BOOL
+  - add active-user-id-index to an existing user_sessions table
+  - add user_id-created_at-index to an existing CV search table
+    (get_recent_searches queries it)
+  - build the per-user CV analytics rollup row for users that have CVs; users
+    without a row afterwards start counting from zero
+  - backfill active_user_id on active sessions (sparse active-user-id-index)
+  - rewrite legacy ISO string user timestamps as epoch microseconds (N);
+    run after deploying EpochMicrosDateTimeAttribute (it reads both S and N,
+    the old UTCDateTimeAttribute code cannot read N)
+  - rewrite legacy JSON string CV analysis_result/raw_content as native maps (M);
+    run after deploying JSONMapAttribute (it reads both S and M, the old
+    JSONAttribute code cannot read M)
+  - recreate the users email-index with a KEYS_ONLY projection (setup_db.py only
+    applies it to new tables); email lookups fail until the new index is ACTIVE,
+    so run it in a maintenance window
+
+Deploy order for existing environments:
+  1. --create-otp-email-index, --create-active-session-index and
+     --create-search-user-index (each waits for ACTIVE)
+  2. --backfill-active-sessions and --backfill-cv-analytics (right before the
+     deploy: CV changes made by the old code after the backfill are not counted)
+  3. deploy the application
+  4. --migrate-user-timestamps and --migrate-cv-maps
 
 Usage:
+  python scripts/migrate_data.py --create-otp-email-index
+  python scripts/migrate_data.py --create-active-session-index
+  python scripts/migrate_data.py --create-search-user-index
   python scripts/migrate_data.py --normalize-users
+  python scripts/migrate_data.py --migrate-otp-flags
+  python scripts/migrate_data.py --backfill-active-sessions
+  python scripts/migrate_data.py --backfill-cv-analytics
+  python scripts/migrate_data.py --migrate-user-timestamps
+  python scripts/migrate_data.py --migrate-cv-maps
+  python scripts/migrate_data.py --recreate-email-index
 """
 
 import click
+import json
+import time
 from datetime import datetime
-from app.models.user import UserTable
+from decimal import Decimal
+from boto3.dynamodb.types import TypeSerializer
+from app.core.database import db_client
+from app.models.user import UserTable, UserSessionTable, EpochMicrosDateTimeAttribute, parse_dynamo_datetime
+from app.models.otp import OTPTable
+from app.models.cv_storage import CVTable, CVSearchTable
+from app.repositories.cv_storage import cv_storage_repository
+
+
+def migrate_otp_flags() -> int:
+    """Rewrite string is_used values as BOOL.
+
+    Uses the low-level client: legacy rows cannot be loaded through OTPTable
+    once is_used is a BooleanAttribute.
+    """
+    client = db_client.client
+    table_name = OTPTable.Meta.table_name
+    scan_kwargs = {
+        "TableName": table_name,
+        "FilterExpression": "attribute_type(is_used, :s)",
+        "ExpressionAttributeValues": {":s": {"S": "S"}},
+        "ProjectionExpression": "otp_id, is_used",
+    }
+    count = 0
+    while True:
+        response = client.scan(**scan_kwargs)
+        for row in response.get("Items", []):
+            client.update_item(
+                TableName=table_name,
+                Key={"otp_id": row["otp_id"]},
+                UpdateExpression="SET is_used = :v",
+                ExpressionAttributeValues={":v": {"BOOL": row["is_used"]["S"] == "true"}},
+            )
+            count += 1
+        if "LastEvaluatedKey" not in response:
+            return count
+        scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+_USER_TIMESTAMP_FIELDS = ("created_at", "updated_at", "last_login")
+
+
+def migrate_user_timestamps() -> int:
+    """Rewrite string created_at/updated_at/last_login values as epoch-microsecond N.
+
+    Uses the low-level client so only the S-typed attributes are rewritten.
+    """
+    client = db_client.client
+    table_name = UserTable.Meta.table_name
+    encoder = EpochMicrosDateTimeAttribute()
+    scan_kwargs = {
+        "TableName": table_name,
+        "FilterExpression": " OR ".join(f"attribute_type({name}, :s)" for name in _USER_TIMESTAMP_FIELDS),
+        "ExpressionAttributeValues": {":s": {"S": "S"}},
+        "ProjectionExpression": "user_id, " + ", ".join(_USER_TIMESTAMP_FIELDS),
+    }
+    count = 0
+    while True:
+        response = client.scan(**scan_kwargs)
+        for row in response.get("Items", []):
+            legacy = [name for name in _USER_TIMESTAMP_FIELDS if "S" in row.get(name, {})]
+            client.update_item(
+                TableName=table_name,
+                Key={"user_id": row["user_id"]},
+                UpdateExpression="SET " + ", ".join(f"{name} = :{name}" for name in legacy),
+                ExpressionAttributeValues={
+                    f":{name}": {"N": encoder.serialize(parse_dynamo_datetime(row[name]["S"]))}
+                    for name in legacy
+                },
+            )
+            count += 1
+        if "LastEvaluatedKey" not in response:
+            return count
+        scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+_CV_MAP_FIELDS = ("analysis_result", "raw_content")
+
+
+def migrate_cv_maps() -> int:
+    """Rewrite JSON string analysis_result/raw_content values as native maps.
+
+    Uses the low-level client so only the S-typed attributes are rewritten.
+    """
+    client = db_client.client
+    table_name = CVTable.Meta.table_name
+    serializer = TypeSerializer()
+    scan_kwargs = {
+        "TableName": table_name,
+        "FilterExpression": " OR ".join(f"attribute_type({name}, :s)" for name in _CV_MAP_FIELDS),
+        "ExpressionAttributeValues": {":s": {"S": "S"}},
+        "ProjectionExpression": "cv_id, " + ", ".join(_CV_MAP_FIELDS),
+    }
+    count = 0
+    while True:
+        response = client.scan(**scan_kwargs)
+        for row in response.get("Items", []):
+            values = {}
+            for name in _CV_MAP_FIELDS:
+                if "S" not in row.get(name, {}):
+                    continue
+                try:
+                    data = json.loads(row[name]["S"] or "{}", parse_float=Decimal)
+                except ValueError:
+                    data = {}
+                values[f":{name}"] = serializer.serialize(data if isinstance(data, dict) else {})
+            client.update_item(
+                TableName=table_name,
+                Key={"cv_id": row["cv_id"]},
+                UpdateExpression="SET " + ", ".join(f"{key[1:]} = {key}" for key in values),
+                ExpressionAttributeValues=values,
+            )
+            count += 1
+        if "LastEvaluatedKey" not in response:
+            return count
+        scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def _find_index(client, table_name: str, index_name: str):
+    indexes = client.describe_table(TableName=table_name)["Table"].get("GlobalSecondaryIndexes", [])
+    return next((index for index in indexes if index["IndexName"] == index_name), None)
+
+
+def _create_index(
+    client, table_name: str, index: dict, attribute_definitions: list, poll_seconds: int = 10, capacity: int = 1
+) -> None:
+    """Add a GSI to an existing table and wait until it is ACTIVE."""
+    table = client.describe_table(TableName=table_name)["Table"]
+    if table.get("BillingModeSummary", {}).get("BillingMode") != "PAY_PER_REQUEST":
+        # Tables provisioned outside setup_db.py may use provisioned capacity
+        index = dict(index, ProvisionedThroughput={"ReadCapacityUnits": capacity, "WriteCapacityUnits": capacity})
+    client.update_table(
+        TableName=table_name,
+        AttributeDefinitions=attribute_definitions,
+        GlobalSecondaryIndexUpdates=[{"Create": index}],
+    )
+    while (_find_index(client, table_name, index["IndexName"]) or {}).get("IndexStatus") != "ACTIVE":
+        time.sleep(poll_seconds)
+
+
+def create_otp_email_index(poll_seconds: int = 10) -> bool:
+    """Add email-created_at-index to otp_verifications; returns False when it already exists."""
+    client = db_client.client
+    table_name = OTPTable.Meta.table_name
+    if _find_index(client, table_name, "email-created_at-index"):
+        return False
+
+    _create_index(
+        client,
+        table_name,
+        {
+            "IndexName": "email-created_at-index",
+            "KeySchema": [
+                {"AttributeName": "email", "KeyType": "HASH"},
+                {"AttributeName": "created_at", "KeyType": "RANGE"},
+            ],
+            "Projection": {"ProjectionType": "ALL"},
+        },
+        [
+            {"AttributeName": "email", "AttributeType": "S"},
+            {"AttributeName": "created_at", "AttributeType": "S"},
+        ],
+        poll_seconds,
+    )
+    return True
+
+
+def recreate_email_index_keys_only(poll_seconds: int = 10) -> bool:
+    """Delete and recreate email-index as KEYS_ONLY; returns False when it already is."""
+    client = db_client.client
+    table_name = UserTable.Meta.table_name
+    index = _find_index(client, table_name, "email-index")
+    if index and index["Projection"]["ProjectionType"] == "KEYS_ONLY":
+        return False
+
+    if index:
+        client.update_table(
+            TableName=table_name,
+            GlobalSecondaryIndexUpdates=[{"Delete": {"IndexName": "email-index"}}],
+        )
+        while _find_index(client, table_name, "email-index"):
+            time.sleep(poll_seconds)
+
+    _create_index(
+        client,
+        table_name,
+        {
+            "IndexName": "email-index",
+            "KeySchema": [{"AttributeName": "email", "KeyType": "HASH"}],
+            "Projection": {"ProjectionType": "KEYS_ONLY"},
+        },
+        [{"AttributeName": "email", "AttributeType": "S"}],
+        poll_seconds,
+    )
+    return True
+
+
+def create_active_session_index(poll_seconds: int = 10) -> bool:
+    """Add active-user-id-index to user_sessions; returns False when it already exists."""
+    client = db_client.client
+    table_name = UserSessionTable.Meta.table_name
+    if _find_index(client, table_name, "active-user-id-index"):
+        return False
+
+    _create_index(
+        client,
+        table_name,
+        {
+            "IndexName": "active-user-id-index",
+            "KeySchema": [{"AttributeName": "active_user_id", "KeyType": "HASH"}],
+            "Projection": {"ProjectionType": "ALL"},
+        },
+        [{"AttributeName": "active_user_id", "AttributeType": "S"}],
+        poll_seconds,
+    )
+    return True
+
+
+def create_search_user_index(poll_seconds: int = 10) -> bool:
+    """Add user_id-created_at-index to the CV search table; returns False when it already exists."""
+    client = db_client.client
+    table_name = CVSearchTable.Meta.table_name
+    if _find_index(client, table_name, "user_id-created_at-index"):
+        return False
+
+    _create_index(
+        client,
+        table_name,
+        {
+            "IndexName": "user_id-created_at-index",
+            "KeySchema": [
+                {"AttributeName": "user_id", "KeyType": "HASH"},
+                {"AttributeName": "created_at", "KeyType": "RANGE"},
+            ],
+            "Projection": {"ProjectionType": "ALL"},
+        },
+        [
+            {"AttributeName": "user_id", "AttributeType": "S"},
+            {"AttributeName": "created_at", "AttributeType": "S"},
+        ],
+        poll_seconds,
+        capacity=5,
+    )
+    return True
+
+
+def backfill_active_sessions() -> int:
+    """Set active_user_id on active sessions created before the sparse index existed."""
+    count = 0
+    condition = (UserSessionTable.is_active == True) & UserSessionTable.active_user_id.does_not_exist()  # noqa: E712
+    for item in UserSessionTable.scan(condition):
+        item.update(actions=[UserSessionTable.active_user_id.set(item.user_id)])
+        count += 1
+    return count
+
+
+def backfill_cv_analytics() -> int:
+    """Create the analytics rollup row for every user that has CVs (existing rows are kept)."""
+    user_ids = {item.user_id for item in CVTable.scan(attributes_to_get=["user_id"])}
+    for user_id in user_ids:
+        cv_storage_repository.rebuild_cv_analytics(user_id)
+    return len(user_ids)
 
 
 @click.command()
+@click.option("--create-otp-email-index", "create_otp_index", is_flag=True, default=False, help="Add email-created_at-index to the OTP table")
+@click.option("--create-active-session-index", "create_session_index", is_flag=True, default=False, help="Add active-user-id-index to the sessions table")
+@click.option("--create-search-user-index", "create_search_index", is_flag=True, default=False, help="Add user_id-created_at-index to the CV search table")
 @click.option("--normalize-users", is_flag=True, default=True, help="Normalize user fields")
-def main(normalize_users: bool) -> None:
+@click.option("--migrate-otp-flags", "migrate_otp", is_flag=True, default=False, help="Convert OTP is_used strings to BOOL")
+@click.option("--backfill-active-sessions", "backfill_sessions", is_flag=True, default=False, help="Index active sessions in active-user-id-index")
+@click.option("--backfill-cv-analytics", "backfill_analytics", is_flag=True, default=False, help="Build CV analytics rollups for existing users")
+@click.option("--migrate-user-timestamps", "migrate_timestamps", is_flag=True, default=False, help="Convert user ISO timestamps to epoch microseconds")
+@click.option("--migrate-cv-maps", "migrate_cv", is_flag=True, default=False, help="Convert CV JSON string analysis fields to maps")
+@click.option("--recreate-email-index", "recreate_email_index", is_flag=True, default=False, help="Recreate users email-index as KEYS_ONLY")
+def main(
+    create_otp_index: bool,
+    create_session_index: bool,
+    create_search_index: bool,
+    normalize_users: bool,
+    migrate_otp: bool,
+    backfill_sessions: bool,
+    backfill_analytics: bool,
+    migrate_timestamps: bool,
+    migrate_cv: bool,
+    recreate_email_index: bool,
+) -> None:
+    if create_otp_index:
+        if create_otp_email_index():
+            click.echo("Created email-created_at-index on the OTP table")
+        else:
+            click.echo("email-created_at-index already exists")
+
+    # Before the backfill: sessions are only findable once the index exists
+    if create_session_index:
+        if create_active_session_index():
+            click.echo("Created active-user-id-index on the sessions table")
+        else:
+            click.echo("active-user-id-index already exists")
+
+    if create_search_index:
+        if create_search_user_index():
+            click.echo("Created user_id-created_at-index on the CV search table")
+        else:
+            click.echo("user_id-created_at-index already exists")
+
+    if migrate_timestamps:
+        click.echo(f"Migrated timestamps on {migrate_user_timestamps()} users")
+
+    if recreate_email_index:
+        if recreate_email_index_keys_only():
+            click.echo("Recreated email-index as KEYS_ONLY")
+        else:
+            click.echo("email-index is already KEYS_ONLY")
+
+    if migrate_cv:
+        click.echo(f"Migrated analysis maps on {migrate_cv_maps()} CVs")
+
+    if migrate_otp:
+        click.echo(f"Migrated {migrate_otp_flags()} OTP records")
+
+    if backfill_sessions:
+        click.echo(f"Backfilled {backfill_active_sessions()} active sessions")
+
+    if backfill_analytics:
+        click.echo(f"Backfilled CV analytics for {backfill_cv_analytics()} users")
+
     if normalize_users:
         count = 0
         for item in UserTable.scan():
@@ -9,6 +9,7 @@ from app.core.config import settings
 
 USERS_TABLE_NAME = "users"
 USER_SESSIONS_TABLE_NAME = "user_sessions"
+OTP_TABLE_NAME = "otp_verifications"
 
 
 def _dynamodb_resource():
@@ -64,7 +65,8 @@ def _create_users_table() -> None:
                 "KeySchema": [
                     {"AttributeName": "email", "KeyType": "HASH"},
                 ],
-                "Projection": {"ProjectionType": "ALL"},
+                # Existing tables keep their projection: migrate_data.py --recreate-email-index
+                "Projection": {"ProjectionType": "KEYS_ONLY"},
             }
         ],
         BillingMode="PAY_PER_REQUEST",
@@ -85,6 +87,7 @@ def _create_user_sessions_table() -> None:
         AttributeDefinitions=[
             {"AttributeName": "session_id", "AttributeType": "S"},
             {"AttributeName": "user_id", "AttributeType": "S"},
+            {"AttributeName": "active_user_id", "AttributeType": "S"},
         ],
         GlobalSecondaryIndexes=[
             {
@@ -93,6 +96,43 @@ def _create_user_sessions_table() -> None:
                     {"AttributeName": "user_id", "KeyType": "HASH"},
                 ],
                 "Projection": {"ProjectionType": "ALL"},
+            },
+            {
+                "IndexName": "active-user-id-index",
+                "KeySchema": [
+                    {"AttributeName": "active_user_id", "KeyType": "HASH"},
+                ],
+                "Projection": {"ProjectionType": "ALL"},
+            },
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    table.wait_until_exists()
+
+
+def _create_otp_table() -> None:
+    dynamodb = _dynamodb_resource()
+    if _table_exists(OTP_TABLE_NAME):
+        return
+
+    table = dynamodb.create_table(
+        TableName=OTP_TABLE_NAME,
+        KeySchema=[
+            {"AttributeName": "otp_id", "KeyType": "HASH"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "otp_id", "AttributeType": "S"},
+            {"AttributeName": "email", "AttributeType": "S"},
+            {"AttributeName": "created_at", "AttributeType": "S"},
+        ],
+        GlobalSecondaryIndexes=[
+            {
+                "IndexName": "email-created_at-index",
+                "KeySchema": [
+                    {"AttributeName": "email", "KeyType": "HASH"},
+                    {"AttributeName": "created_at", "KeyType": "RANGE"},
+                ],
+                "Projection": {"ProjectionType": "ALL"},
             }
         ],
         BillingMode="PAY_PER_REQUEST",
@@ -100,9 +140,22 @@ def _create_user_sessions_table() -> None:
     table.wait_until_exists()
 
 
+def _enable_ttl(table_name: str, attribute_name: str) -> None:
+    client = _dynamodb_resource().meta.client
+    status = client.describe_time_to_live(TableName=table_name)["TimeToLiveDescription"]
+    if status.get("TimeToLiveStatus") in ("ENABLED", "ENABLING"):
+        return
+
+    client.update_time_to_live(
+        TableName=table_name,
+        TimeToLiveSpecification={"Enabled": True, "AttributeName": attribute_name},
+    )
+
+
 def ensure_tables(create: bool = True, delete: bool = False) -> None:
     """Create or delete DynamoDB tables using boto3 (On-demand)."""
     if delete:
+        _delete_table_if_exists(OTP_TABLE_NAME)
         _delete_table_if_exists(USER_SESSIONS_TABLE_NAME)
         _delete_table_if_exists(USERS_TABLE_NAME)
         return
@@ -110,6 +163,9 @@ def ensure_tables(create: bool = True, delete: bool = False) -> None:
     if create:
         _create_users_table()
         _create_user_sessions_table()
+        _create_otp_table()
+        # Expired OTPs are removed by DynamoDB TTL instead of a cleanup job
+        _enable_ttl(OTP_TABLE_NAME, "ttl")
 
 
 @click.command()
@@ -120,6 +176,7 @@ def main(create: bool, delete: bool) -> None:
     ensure_tables(create=create, delete=delete)
     click.echo(
         f"Users table: {USERS_TABLE_NAME} | User sessions table: {USER_SESSIONS_TABLE_NAME}"
+        f" | OTP table: {OTP_TABLE_NAME}"
     )
 
 
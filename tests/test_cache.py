@@ -0,0 +1,68 @@
+import app.utils.cache as cache_mod
+from app.utils.cache import MISS, TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _cache_with_clock(monkeypatch, **kwargs):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_mod.time, "monotonic", clock)
+    return TTLCache(**kwargs), clock
+
+
+def test_ttl_cache_get_and_miss(monkeypatch):
+    cache, _ = _cache_with_clock(monkeypatch, ttl=10)
+
+    assert cache.get("a") is MISS
+    assert cache.get("a", None) is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+
+
+def test_ttl_cache_entries_expire(monkeypatch):
+    cache, clock = _cache_with_clock(monkeypatch, ttl=10)
+    cache.set("a", 1)
+
+    clock.now += 9
+    assert cache.get("a") == 1
+    clock.now += 1
+    assert cache.get("a") is MISS
+
+
+def test_ttl_cache_negative_entries_use_negative_ttl(monkeypatch):
+    cache, clock = _cache_with_clock(monkeypatch, ttl=10, negative_ttl=2)
+    cache.set("missing", None)
+
+    assert cache.get("missing") is None
+    clock.now += 2
+    assert cache.get("missing") is MISS
+
+
+def test_ttl_cache_evicts_least_recently_used(monkeypatch):
+    cache, _ = _cache_with_clock(monkeypatch, maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is MISS
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_invalidate_and_clear(monkeypatch):
+    cache, _ = _cache_with_clock(monkeypatch, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    cache.invalidate("a")
+    cache.invalidate("unknown")
+    assert cache.get("a") is MISS
+    cache.clear()
+    assert cache.get("b") is MISS
@@ -0,0 +1,100 @@
+from datetime import date
+
+from app.models.cv import (
+    Certification, ContactInfo, CVAnalysis, DocumentType, PersonalInfo, Project, WorkExperience,
+    _sort_most_recent_first,
+)
+
+
+def _experience(company, start_date=None):
+    return WorkExperience(company=company, position="Engineer", start_date=start_date)
+
+
+def test_sort_most_recent_first_keeps_sorted_list():
+    items = [_experience("B", date(2022, 1, 1)), _experience("A", date(2020, 1, 1))]
+
+    assert _sort_most_recent_first(items, "start_date") is items
+
+
+def test_sort_most_recent_first_orders_and_puts_missing_dates_last():
+    items = [
+        _experience("old", date(2018, 1, 1)),
+        _experience("undated"),
+        _experience("new", date(2023, 1, 1)),
+    ]
+
+    result = _sort_most_recent_first(items, "start_date")
+
+    assert [item.company for item in result] == ["new", "old", "undated"]
+
+
+def test_sort_most_recent_first_empty_list():
+    assert _sort_most_recent_first([], "start_date") == []
+
+
+def test_calculate_scores_empty_analysis():
+    analysis = CVAnalysis(document_type=DocumentType.CV)
+
+    assert analysis.completeness_score == 0
+    assert analysis.quality_score == 0
+
+
+def test_calculate_scores_from_sections():
+    analysis = CVAnalysis(
+        document_type=DocumentType.CV,
+        personal_info={"full_name": "Jane Doe", "contact": {"city": "Hanoi"}},
+        work_experience=[{"company": "Acme", "position": "Engineer"}],
+        education=[{"institution": "HUST", "level": "bachelor"}],
+        skills=[{"name": "Python", "category": "technical"}, {"name": "SQL", "category": "technical"}],
+    )
+
+    assert analysis.completeness_score == 100
+    # contact 20 + 1 experience 10 + 2 skills 4 + 1 education 10
+    assert analysis.quality_score == 44
+
+
+def test_calculate_scores_keeps_stored_scores():
+    analysis = CVAnalysis(document_type=DocumentType.CV, quality_score=80, completeness_score=75)
+
+    assert analysis.quality_score == 80
+    assert analysis.completeness_score == 75
+
+
+def test_calculate_scores_recomputes_when_a_score_is_missing():
+    analysis = CVAnalysis(document_type=DocumentType.CV, quality_score=80)
+
+    assert analysis.quality_score == 0
+    assert analysis.completeness_score == 0
+
+
+def test_nested_ingest_models_ignore_extra_keys():
+    analysis = CVAnalysis(
+        document_type=DocumentType.CV,
+        work_experience=[{"company": "Acme", "position": "Engineer", "salary": "n/a"}],
+        skills=[{"name": "Python", "category": "technical", "source": "textract"}],
+    )
+
+    assert analysis.work_experience[0].company == "Acme"
+    assert analysis.skills[0].name == "Python"
+
+
+def test_contact_info_accepts_blank_and_bare_urls():
+    contact = ContactInfo(email="", linkedin="linkedin.com/in/jane", github="", website=" ")
+
+    assert contact.email is None
+    assert str(contact.linkedin) == "https://linkedin.com/in/jane"
+    assert contact.github is None
+    assert contact.website is None
+
+
+def test_project_and_certification_urls_get_a_scheme():
+    project = Project(name="Resume parser", url="github.com/jane/parser")
+    certification = Certification(name="AWS SAA", issuer="Amazon", url="")
+
+    assert str(project.url) == "https://github.com/jane/parser"
+    assert certification.url is None
+
+
+def test_personal_info_blank_full_name_is_missing():
+    assert PersonalInfo(full_name="").full_name is None
+    assert PersonalInfo(full_name="  Jane Doe ").full_name == "Jane Doe"
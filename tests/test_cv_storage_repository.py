@@ -0,0 +1,291 @@
+import base64
+from collections import Counter
+
+import pytest
+from botocore.exceptions import ClientError
+from pynamodb.exceptions import PutError, UpdateError
+from pynamodb.constants import ALL_OLD, ATTRIBUTES
+from pynamodb.expressions.update import AddAction, RemoveAction, SetAction
+
+import app.repositories.cv_storage as cv_storage_repo
+from app.models.cv_storage import CVAnalyticsTable, CVTable
+from app.repositories.cv_storage import (
+    CVStorageRepository,
+    _analytics_actions,
+    _cv_cache,
+    _analytics_initial_row,
+    _decode_cursor,
+    _encode_cursor,
+)
+
+
+ANALYZED = {
+    'analyzed_cvs': 1,
+    'completeness': 75,
+    'quality': 40,
+    'skills': Counter({'Python': 1}),
+    'experience': Counter({'3': 1}),
+    'education': Counter(),
+}
+
+
+def _failure(error_cls, code='ConditionalCheckFailedException'):
+    return error_cls("failed", cause=ClientError({'Error': {'Code': code, 'Message': 'failed'}}, 'UpdateItem'))
+
+
+def test_cursor_round_trip():
+    key = {'cv_id': {'S': 'cv-1'}, 'user_id': {'S': 'u-1'}}
+
+    cursor = _encode_cursor(key)
+
+    assert isinstance(cursor, str)
+    assert _decode_cursor(cursor) == key
+
+
+def test_encode_cursor_without_key():
+    assert _encode_cursor(None) is None
+    assert _encode_cursor({}) is None
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor",
+    base64.urlsafe_b64encode(b"[1, 2]").decode(),
+])
+def test_decode_cursor_rejects_garbage(cursor):
+    with pytest.raises(ValueError):
+        _decode_cursor(cursor)
+
+
+def test_analytics_actions_no_change():
+    assert _analytics_actions({}, {}) == []
+    assert _analytics_actions(ANALYZED, ANALYZED) == []
+
+
+def test_analytics_actions_total_only():
+    actions = _analytics_actions({}, {}, total_delta=1)
+
+    assert len(actions) == 1
+    assert isinstance(actions[0], AddAction)
+
+
+def test_analytics_actions_new_analysis():
+    actions = _analytics_actions({}, ANALYZED)
+
+    # analyzed, completeness total/count, quality total/count
+    assert sum(isinstance(action, AddAction) for action in actions) == 5
+    # skill and experience distribution entries
+    assert sum(isinstance(action, SetAction) for action in actions) == 2
+
+
+def test_analytics_actions_score_change_keeps_counts():
+    actions = _analytics_actions(ANALYZED, dict(ANALYZED, completeness=100))
+
+    assert len(actions) == 1
+    assert isinstance(actions[0], AddAction)
+
+
+def test_analytics_initial_row_from_delta():
+    row = _analytics_initial_row('u-1', {}, ANALYZED, total_delta=1)
+
+    assert row.analytics_id == row.user_id == 'u-1'
+    assert row.total_cvs == 1
+    assert row.analyzed_cvs == 1
+    assert row.completeness_total == 75
+    assert row.completeness_count == 1
+    assert row.to_dict()['skill_distribution'] == {'Python': 1}
+    assert row.to_dict()['education_distribution'] == {}
+
+
+def test_analytics_initial_row_clamps_removals():
+    row = _analytics_initial_row('u-1', ANALYZED, {}, total_delta=-1)
+
+    assert row.total_cvs == 0
+    assert row.analyzed_cvs == 0
+    assert row.quality_total == 0
+    assert row.to_dict()['skill_distribution'] == {}
+
+
+class FakeAnalyticsWrites:
+    """Replaces CVAnalyticsTable.update/save; each call pops the next outcome (None = success)"""
+
+    def __init__(self, monkeypatch, updates=(), saves=()):
+        self.updates, self.saves = list(updates), list(saves)
+        self.update_calls, self.saved = 0, []
+        fake = self
+
+        def update(self, actions, condition=None):
+            fake.update_calls += 1
+            error = fake.updates.pop(0) if fake.updates else None
+            if error:
+                raise error
+
+        def save(self, condition=None):
+            fake.saved.append(self)
+            error = fake.saves.pop(0) if fake.saves else None
+            if error:
+                raise error
+
+        monkeypatch.setattr(CVAnalyticsTable, "update", update)
+        monkeypatch.setattr(CVAnalyticsTable, "save", save)
+
+
+def test_apply_analytics_delta_updates_existing_row(monkeypatch):
+    writes = FakeAnalyticsWrites(monkeypatch)
+
+    CVStorageRepository()._apply_analytics_delta('u-1', {}, {}, 1)
+
+    assert writes.update_calls == 1
+    assert writes.saved == []
+
+
+def test_apply_analytics_delta_creates_missing_row(monkeypatch):
+    writes = FakeAnalyticsWrites(monkeypatch, updates=[_failure(UpdateError)])
+
+    CVStorageRepository()._apply_analytics_delta('u-1', {}, ANALYZED, 1)
+
+    assert writes.update_calls == 1
+    assert len(writes.saved) == 1
+    assert writes.saved[0].total_cvs == 1
+
+
+def test_apply_analytics_delta_retries_update_when_put_loses_race(monkeypatch):
+    writes = FakeAnalyticsWrites(monkeypatch, updates=[_failure(UpdateError)], saves=[_failure(PutError)])
+
+    CVStorageRepository()._apply_analytics_delta('u-1', {}, {}, 1)
+
+    assert writes.update_calls == 2
+    assert len(writes.saved) == 1
+
+
+def test_apply_analytics_delta_does_not_create_row_on_other_errors(monkeypatch):
+    writes = FakeAnalyticsWrites(monkeypatch, updates=[_failure(UpdateError, 'ProvisionedThroughputExceededException')])
+
+    CVStorageRepository()._apply_analytics_delta('u-1', {}, {}, 1)
+
+    assert writes.update_calls == 1
+    assert writes.saved == []
+
+
+def _cv_record(cv_id='cv-1'):
+    return CVTable(
+        cv_id, user_id='u-1', filename='cv.pdf', file_size=1024, file_type='pdf',
+        s3_key='cvs/cv.pdf', s3_url='https://bucket/cvs/cv.pdf'
+    )
+
+
+@pytest.fixture
+def cv_table_gets(monkeypatch):
+    """Counts CVTable.get calls; ids listed in `missing` raise DoesNotExist"""
+    calls = []
+    missing = set()
+
+    def get(cv_id, *args, **kwargs):
+        calls.append(cv_id)
+        if cv_id in missing:
+            raise CVTable.DoesNotExist()
+        return _cv_record(cv_id)
+
+    _cv_cache.clear()
+    monkeypatch.setattr(CVTable, "get", get)
+    monkeypatch.setattr(CVStorageRepository, "_apply_analytics_delta", lambda self, *args: None)
+    yield calls, missing
+    _cv_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_get_cv_by_id_is_cached(cv_table_gets):
+    calls, _ = cv_table_gets
+    repo = CVStorageRepository()
+
+    first = await repo.get_cv_by_id('cv-1')
+    first['status'] = 'changed by caller'
+    second = await repo.get_cv_by_id('cv-1')
+
+    assert calls == ['cv-1']
+    assert second['status'] == 'uploaded'
+
+
+@pytest.mark.asyncio
+async def test_get_cv_by_id_caches_not_found(cv_table_gets):
+    calls, missing = cv_table_gets
+    missing.add('cv-404')
+    repo = CVStorageRepository()
+
+    assert await repo.get_cv_by_id('cv-404') is None
+    assert await repo.get_cv_by_id('cv-404') is None
+    assert calls == ['cv-404']
+
+
+@pytest.mark.asyncio
+async def test_update_cv_status_invalidates_cache(cv_table_gets, monkeypatch):
+    calls, _ = cv_table_gets
+    monkeypatch.setattr(cv_storage_repo, "_update_cv_returning_old", lambda cv_id, changes: _cv_record(cv_id))
+    repo = CVStorageRepository()
+
+    await repo.get_cv_by_id('cv-1')
+    await repo.update_cv_status('cv-1', 'processing')
+    await repo.get_cv_by_id('cv-1')
+
+    assert calls == ['cv-1', 'cv-1']
+
+
+@pytest.mark.asyncio
+async def test_delete_cv_invalidates_cache(cv_table_gets, monkeypatch):
+    calls, _ = cv_table_gets
+    monkeypatch.setattr(CVTable, "delete", lambda self, *args, **kwargs: None)
+    repo = CVStorageRepository()
+
+    await repo.get_cv_by_id('cv-1')
+    assert await repo.delete_cv('cv-1', 'u-1') is True
+    await repo.get_cv_by_id('cv-1')
+
+    # get (cache miss), get inside delete_cv, get after invalidation
+    assert calls == ['cv-1', 'cv-1', 'cv-1']
+
+
+class FakeConnection:
+    def __init__(self, old=None, error=None):
+        self.old, self.error = old, error
+        self.calls = []
+
+    def update_item(self, hash_key, actions=None, condition=None, return_values=None):
+        self.calls.append((hash_key, actions, condition, return_values))
+        if self.error:
+            raise self.error
+        return {ATTRIBUTES: self.old.serialize()}
+
+
+def test_update_cv_returning_old_sets_and_removes(monkeypatch):
+    old = _cv_record()
+    old.textract_job_id = 'job-1'
+    connection = FakeConnection(old=old)
+    monkeypatch.setattr(CVTable, "_get_connection", lambda: connection)
+
+    result = _update_cv_returning_old('cv-1', {'status': 'analyzed', 'textract_job_id': None})
+
+    hash_key, actions, condition, return_values = connection.calls[0]
+    assert hash_key == 'cv-1'
+    assert return_values == ALL_OLD
+    assert condition is not None
+    assert isinstance(actions[0], SetAction)
+    assert isinstance(actions[1], RemoveAction)
+    assert str(actions[1].values[0]) == 'textract_job_id'
+    # Trả về bản ghi trước khi update
+    assert result.status == 'uploaded'
+    assert result.textract_job_id == 'job-1'
+
+
+def test_update_cv_returning_old_missing_cv(monkeypatch):
+    connection = FakeConnection(error=_failure(UpdateError))
+    monkeypatch.setattr(CVTable, "_get_connection", lambda: connection)
+
+    with pytest.raises(CVTable.DoesNotExist):
+        _update_cv_returning_old('cv-404', {'status': 'processing'})
+
+
+def test_update_cv_returning_old_reraises_other_errors(monkeypatch):
+    connection = FakeConnection(error=_failure(UpdateError, 'ProvisionedThroughputExceededException'))
+    monkeypatch.setattr(CVTable, "_get_connection", lambda: connection)
+
+    with pytest.raises(UpdateError):
+        _update_cv_returning_old('cv-1', {'status': 'processing'})
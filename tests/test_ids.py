@@ -0,0 +1,14 @@
+import uuid
+
+from app.utils.ids import fast_uuid4_str
+
+
+def test_fast_uuid4_str_is_random_uuid4():
+    values = {fast_uuid4_str() for _ in range(1000)}
+
+    assert len(values) == 1000
+    for value in values:
+        parsed = uuid.UUID(value)
+        assert parsed.version == 4
+        assert parsed.variant == uuid.RFC_4122
+        assert str(parsed) == value
@@ -0,0 +1,8 @@
+import re
+
+from app.models.otp import generate_otp_code
+
+
+def test_generate_otp_code_is_six_digits():
+    for _ in range(1000):
+        assert re.fullmatch(r"[1-9]\d{5}", generate_otp_code())
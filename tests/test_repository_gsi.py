@@ -23,12 +23,16 @@ def test_get_user_by_email_gsi(monkeypatch):
             self.last_login = None
 
     class FakeIndex:
-        def query(self, email):
+        def query(self, email, **kwargs):
             yield FakeItem()
 
     class FakeUserTable:
         email_index = FakeIndex()
 
+        @staticmethod
+        def get(user_id):
+            return FakeItem()
+
     # patch model
     import app.models.user as user_models
     monkeypatch.setattr(user_models, "UserTable", FakeUserTable)
@@ -60,7 +64,7 @@ def test_get_user_sessions_gsi(monkeypatch):
             yield FakeItem()
 
     class FakeSessionTable:
-        user_id_index = FakeIndex()
+        active_user_id_index = FakeIndex()
 
     import app.models.user as user_models
     monkeypatch.setattr(user_models, "UserSessionTable", FakeSessionTable)
@@ -0,0 +1,191 @@
+from datetime import datetime
+
+import pytest
+from pynamodb.expressions.update import RemoveAction, SetAction
+
+import app.repositories.user as repo_mod
+from app.models.user import UserSessionTable, UserTable
+from app.repositories.user import UserRepository
+
+
+def _user_row(user_id="u1"):
+    now = datetime.utcnow()
+    return UserTable(
+        user_id=user_id,
+        email=f"{user_id}@example.com",
+        password_hash="h",
+        full_name="User One",
+        phone="",
+        role="candidate",
+        status="active",
+        email_verified=True,
+        created_at=now,
+        updated_at=now,
+    )
+
+
+@pytest.fixture
+def repo():
+    repo = UserRepository()
+    repo.bust_cache()
+    yield repo
+    repo.bust_cache()
+
+
+@pytest.fixture
+def user_table_gets(monkeypatch):
+    """Counts UserTable.get calls; ids listed in `missing` raise DoesNotExist"""
+    calls = []
+    missing = set()
+
+    def get(user_id, *args, **kwargs):
+        calls.append(user_id)
+        if user_id in missing:
+            raise UserTable.DoesNotExist()
+        return _user_row(user_id)
+
+    monkeypatch.setattr(UserTable, "get", get)
+    return calls, missing
+
+
+def test_get_user_by_id_is_cached(repo, user_table_gets):
+    calls, _ = user_table_gets
+
+    first = repo.get_user_by_id("u1")
+    first.full_name = "changed by caller"
+    second = repo.get_user_by_id("u1")
+
+    assert calls == ["u1"]
+    assert second.full_name == "User One"
+
+
+def test_get_user_by_id_caches_not_found(repo, user_table_gets):
+    calls, missing = user_table_gets
+    missing.add("u404")
+
+    assert repo.get_user_by_id("u404") is None
+    assert repo.get_user_by_id("u404") is None
+    assert calls == ["u404"]
+
+
+def test_update_user_invalidates_cache(repo, user_table_gets, monkeypatch):
+    calls, _ = user_table_gets
+    monkeypatch.setattr(UserTable, "update", lambda self, actions, condition=None: None)
+
+    repo.get_user_by_id("u1")
+    assert repo.update_user("u1", {"full_name": "Renamed"}) is True
+    repo.get_user_by_id("u1")
+
+    assert calls == ["u1", "u1"]
+
+
+@pytest.fixture
+def user_updates(monkeypatch):
+    """Captures the actions passed to UserTable.update, keyed by attribute name"""
+    updates = []
+
+    def update(self, actions, condition=None):
+        updates.append({str(action.values[0]): action for action in actions})
+
+    monkeypatch.setattr(UserTable, "update", update)
+    return updates
+
+
+def test_update_user_sets_values(repo, user_updates):
+    assert repo.update_user("u1", {"full_name": "Renamed", "email_verified": True}) is True
+
+    actions = user_updates[0]
+    assert set(actions) == {"updated_at", "full_name", "email_verified"}
+    assert all(isinstance(action, SetAction) for action in actions.values())
+
+
+def test_update_user_ignores_unknown_and_key_fields(repo, user_updates):
+    assert repo.update_user("u1", {"user_id": "other", "created_at": None, "nickname": "x"}) is True
+
+    assert set(user_updates[0]) == {"updated_at"}
+
+
+def test_update_user_none_phone_is_stored_empty(repo, user_updates):
+    assert repo.update_user("u1", {"phone": None}) is True
+
+    assert isinstance(user_updates[0]["phone"], SetAction)
+
+
+def test_update_user_none_last_login_is_removed(repo, user_updates):
+    assert repo.update_user("u1", {"last_login": None}) is True
+
+    assert isinstance(user_updates[0]["last_login"], RemoveAction)
+
+
+def test_update_user_rejects_clearing_required_field(repo, user_updates):
+    assert repo.update_user("u1", {"full_name": None}) is False
+
+    assert user_updates == []
+
+
+class FakeTransactWrite:
+    """Stands in for pynamodb's TransactWrite; records the session ids of each transaction"""
+    transactions = []
+
+    def __init__(self, connection=None):
+        self.session_ids = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        FakeTransactWrite.transactions.append(self.session_ids)
+
+    def update(self, model, actions, condition=None):
+        self.session_ids.append(model.session_id)
+
+
+@pytest.fixture
+def session_transactions(monkeypatch):
+    class FakeConnection:
+        connection = object()
+
+    FakeTransactWrite.transactions = []
+    monkeypatch.setattr(repo_mod, "TransactWrite", FakeTransactWrite)
+    monkeypatch.setattr(UserSessionTable, "_get_connection", lambda: FakeConnection())
+    return FakeTransactWrite.transactions
+
+
+def _active_sessions(monkeypatch, count):
+    queries = []
+
+    def query(user_id, **kwargs):
+        queries.append((user_id, kwargs))
+        for i in range(count):
+            yield UserSessionTable(session_id=f"s{i}")
+
+    monkeypatch.setattr(UserSessionTable.active_user_id_index, "query", query)
+    return queries
+
+
+def test_deactivate_user_sessions_transacts_in_chunks_of_25(repo, monkeypatch, session_transactions):
+    _active_sessions(monkeypatch, 30)
+
+    assert repo.deactivate_user_sessions("u1") is True
+
+    assert [len(ids) for ids in session_transactions] == [25, 5]
+    assert session_transactions[0][0] == "s0"
+    assert session_transactions[1][-1] == "s29"
+
+
+def test_deactivate_user_sessions_queries_only_session_ids(repo, monkeypatch, session_transactions):
+    queries = _active_sessions(monkeypatch, 25)
+
+    assert repo.deactivate_user_sessions("u1") is True
+
+    assert queries == [("u1", {"attributes_to_get": ["session_id"]})]
+    # A full chunk is flushed during the query, with no empty trailing transaction
+    assert [len(ids) for ids in session_transactions] == [25]
+
+
+def test_deactivate_user_sessions_without_active_sessions(repo, monkeypatch, session_transactions):
+    _active_sessions(monkeypatch, 0)
+
+    assert repo.deactivate_user_sessions("u1") is True
+
+    assert session_transactions == []
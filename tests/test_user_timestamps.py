@@ -0,0 +1,52 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from app.models.user import EpochMicrosDateTimeAttribute, parse_dynamo_datetime
+
+
+MOMENT = datetime(2024, 1, 31, 12, 34, 56, 123456, tzinfo=timezone.utc)
+MOMENT_MICROS = 1706704496123456
+
+
+def test_parse_epoch_micros():
+    assert parse_dynamo_datetime(MOMENT_MICROS) == MOMENT
+    assert parse_dynamo_datetime(str(MOMENT_MICROS)) == MOMENT
+    assert parse_dynamo_datetime(Decimal(MOMENT_MICROS)) == MOMENT
+
+
+def test_parse_legacy_utc_string():
+    assert parse_dynamo_datetime("2024-01-31T12:34:56.123456+0000") == MOMENT
+
+
+def test_parse_legacy_string_with_offset():
+    value = parse_dynamo_datetime("2024-01-31T19:34:56.123456+0700")
+
+    assert value == MOMENT
+
+
+def test_epoch_micros_attribute_round_trip():
+    attribute = EpochMicrosDateTimeAttribute()
+
+    serialized = attribute.serialize(MOMENT)
+
+    assert serialized == str(MOMENT_MICROS)
+    assert attribute.deserialize(serialized) == MOMENT
+
+
+def test_epoch_micros_attribute_treats_naive_as_utc():
+    attribute = EpochMicrosDateTimeAttribute()
+
+    serialized = attribute.serialize(MOMENT.replace(tzinfo=None))
+
+    assert serialized == str(MOMENT_MICROS)
+    assert attribute.deserialize(serialized) == MOMENT
+
+
+def test_epoch_micros_attribute_reads_legacy_strings():
+    attribute = EpochMicrosDateTimeAttribute()
+
+    legacy = attribute.get_value({'S': '2024-01-31T12:34:56.123456+0000'})
+    migrated = attribute.get_value({'N': str(MOMENT_MICROS)})
+
+    assert attribute.deserialize(legacy) == MOMENT
+    assert attribute.deserialize(migrated) == MOMENT